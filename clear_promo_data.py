@@ -4,99 +4,196 @@
 Удаляет промокоды как из локальной базы данных, так и из WooCommerce (сайта)
 """
 
+import argparse
 import asyncio
-import aiosqlite
+import sqlite3
+import sys
+from database.models import CONNECTION_PRAGMAS, PROMO_DEFAULTS_KEY, SQL_UPSERT_SETTING, encode_promo_defaults
 from utils.config import Config
+from utils.ratelimit import AsyncTokenBucket
 from utils.woocommerce import woo_manager
 
-async def clear_promo_data():
-    """Очистить данные о промокодах"""
-    db_path = Config.DB_PATH
+# Параметры параллельного удаления из WooCommerce
+WOO_CONCURRENCY = 10  # Одновременных запросов
+WOO_RATE_PER_SEC = 10.0  # Запросов в секунду (общий лимит)
+PROGRESS_FLUSH_EVERY = 50  # Строк прогресса в одном выводе
+
+
+def _report(progress: list, line: str):
+    """Добавить строку прогресса и вывести буфер, когда он заполнится"""
+    progress.append(line)
+    if len(progress) >= PROGRESS_FLUSH_EVERY:
+        _flush_progress(progress)
+
+
+def _flush_progress(progress: list):
+    """Вывести накопленные строки прогресса одним вызовом print"""
+    if progress:
+        print("\n".join(progress))
+        progress.clear()
+
+
+async def _delete_one(sem: asyncio.Semaphore, bucket: AsyncTokenBucket, code: str):
+    """Удалить один купон из WooCommerce с учетом ограничений"""
+    async with sem:
+        return code, await woo_manager.delete_coupon(code, rate_limiter=bucket)
+
+
+def _do_cleanup_sync(db_path: str) -> dict:
+    """
+    Очистить промокоды в локальной БД одной транзакцией (синхронно)
     
+    Args:
+        db_path: Путь к файлу БД
+        
+    Returns:
+        Словарь со статистикой до/после очистки и списком (code, woocommerce_id)
+        синхронизированных промокодов для удаления из WooCommerce
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma}")
+        
+        # Берем блокировку на запись сразу, чтобы вся очистка прошла одной транзакцией
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Количество промокодов и пользователей до удаления одним запросом
+            total_promos, total_users = conn.execute("""
+                SELECT (SELECT COUNT(*) FROM promocodes), (SELECT COUNT(*) FROM users)
+            """).fetchone()
+            
+            # Удаляем ВСЕ промокоды; синхронизированные возвращаются тем же
+            # запросом для последующего удаления из WooCommerce.
+            # Строки удаляются физически, а не помечаются неактивными: выдача
+            # промокодов, уведомления и статистика читают всю таблицу, а после
+            # очистки пользователи должны снова получать промокоды. Оставшиеся
+            # строки снимаются безусловным DELETE, который SQLite выполняет
+            # быстрой очисткой таблицы без построчного удаления
+            synced_promos = conn.execute("""
+                DELETE FROM promocodes WHERE woocommerce_synced = 1
+                RETURNING code, woocommerce_id
+            """).fetchall()
+            conn.execute("DELETE FROM promocodes")
+            
+            # Обновляем настройки промокодов на новые значения (13%, 7 дней)
+            conn.execute(SQL_UPSERT_SETTING, (
+                PROMO_DEFAULTS_KEY,
+                encode_promo_defaults({"discount": 13, "duration_days": 7})
+            ))
+            
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        
+        remaining_promos = conn.execute("SELECT COUNT(*) FROM promocodes").fetchone()[0]
+        
+        # Возвращаем освободившиеся страницы и обновляем статистику планировщика
+        # (incremental_vacuum работает только для БД с auto_vacuum=INCREMENTAL)
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("ANALYZE promocodes")
+    finally:
+        conn.close()
+    
+    return {
+        "total_promos": total_promos,
+        "total_users": total_users,
+        "remaining_promos": remaining_promos,
+        "synced_promos": synced_promos,
+    }
+
+
+async def clear_promo_data(concurrency: int = WOO_CONCURRENCY, rate: float = WOO_RATE_PER_SEC):
+    """
+    Очистить данные о промокодах
+    
+    Args:
+        concurrency: Максимум одновременных запросов к WooCommerce
+        rate: Максимум запросов к WooCommerce в секунду
+    """
     print("=" * 50)
     print("ОЧИСТКА ДАННЫХ О ПРОМОКОДАХ")
     print("=" * 50)
     
     try:
-        async with aiosqlite.connect(db_path) as db:
-            # Получаем количество промокодов до удаления
-            cursor = await db.execute("SELECT COUNT(*) FROM promocodes")
-            total_promos = (await cursor.fetchone())[0]
-            
-            # Получаем количество пользователей
-            cursor = await db.execute("SELECT COUNT(*) FROM users")
-            total_users = (await cursor.fetchone())[0]
-            
-            print(f"\n📊 Текущая статистика:")
-            print(f"   Пользователей: {total_users}")
-            print(f"   Промокодов в локальной БД: {total_promos}")
+        # Локальная очистка - несколько последовательных запросов, выполняем их
+        # синхронным sqlite3 одним заданием в пуле потоков
+        stats = await asyncio.get_running_loop().run_in_executor(
+            None, _do_cleanup_sync, Config.DB_PATH
+        )
+        synced_promos = stats["synced_promos"]
+        total_promos = stats["total_promos"]
+        total_users = stats["total_users"]
+        
+        print(f"\n📊 Статистика до очистки:")
+        print(f"   Пользователей: {total_users}")
+        print(f"   Промокодов в локальной БД: {total_promos}")
+        print("\n🗑️  Все промокоды удалены из локальной БД")
+        print("⚙️  Настройки промокодов обновлены")
+        
+        # Удаляем промокоды из WooCommerce (сайта)
+        if Config.WOOCOMMERCE_ENABLED and woo_manager.is_enabled():
+            print(f"\n🌐 Удаление промокодов из WooCommerce (сайта)...")
+            deleted_from_woo = 0
+            failed_from_woo = 0
+            progress = []
             
-            # Получаем все промокоды для удаления из WooCommerce
-            cursor = await db.execute("SELECT code, woocommerce_synced FROM promocodes")
-            all_promos = await cursor.fetchall()
-            
-            # Удаляем промокоды из WooCommerce (сайта)
-            if Config.WOOCOMMERCE_ENABLED and woo_manager.is_enabled():
-                print(f"\n🌐 Удаление промокодов из WooCommerce (сайта)...")
-                deleted_from_woo = 0
-                failed_from_woo = 0
-                
-                for promo_code, is_synced in all_promos:
-                    if is_synced:  # Удаляем только синхронизированные промокоды
-                        try:
-                            success = await woo_manager.delete_coupon(promo_code)
-                            if success:
-                                deleted_from_woo += 1
-                                print(f"   ✓ Удален из WooCommerce: {promo_code}")
-                            else:
-                                failed_from_woo += 1
-                                print(f"   ✗ Не удалось удалить из WooCommerce: {promo_code}")
-                            
-                            # Небольшая задержка между запросами
-                            await asyncio.sleep(0.5)
-                        except Exception as e:
-                            failed_from_woo += 1
-                            print(f"   ✗ Ошибка удаления {promo_code} из WooCommerce: {e}")
-                
-                print(f"\n   Удалено из WooCommerce: {deleted_from_woo}")
-                if failed_from_woo > 0:
-                    print(f"   ⚠️  Не удалось удалить из WooCommerce: {failed_from_woo}")
-            else:
-                print("\nℹ️  WooCommerce интеграция отключена - пропуск удаления с сайта")
+            # Общий лимит частоты для всех запросов к WooCommerce (пакетных и одиночных)
+            sem = asyncio.Semaphore(concurrency)
+            bucket = AsyncTokenBucket(rate, burst=concurrency)
             
-            # Удаляем ВСЕ промокоды из локальной базы данных
-            print("\n🗑️  Удаление всех промокодов из локальной БД...")
-            await db.execute("DELETE FROM promocodes")
+            # Купоны с известным ID удаляем пакетно, остальные - по одному
+            codes_by_id = {woo_id: code for code, woo_id in synced_promos if woo_id}
+            codes_without_id = [code for code, woo_id in synced_promos if not woo_id]
             
-            # Обновляем настройки промокодов на новые значения (13%, 7 дней)
-            print("⚙️  Обновление настроек промокодов...")
-            await db.execute("""
-                INSERT OR REPLACE INTO bot_settings (key, value, updated_date)
-                VALUES ('promo_discount_percent', '13', datetime('now'))
-            """)
-            await db.execute("""
-                INSERT OR REPLACE INTO bot_settings (key, value, updated_date)
-                VALUES ('promo_duration_days', '7', datetime('now'))
-            """)
+            batch_result = await woo_manager.delete_coupons_batch(list(codes_by_id), rate_limiter=bucket)
+            for woo_id in batch_result["deleted"]:
+                deleted_from_woo += 1
+                _report(progress, f"   ✓ Удален из WooCommerce: {codes_by_id[woo_id]}")
+            for woo_id in batch_result["failed"]:
+                failed_from_woo += 1
+                _report(progress, f"   ✗ Не удалось удалить из WooCommerce: {codes_by_id[woo_id]}")
             
-            await db.commit()
+            tasks = [_delete_one(sem, bucket, code) for code in codes_without_id]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
             
-            # Проверяем результат
-            cursor = await db.execute("SELECT COUNT(*) FROM promocodes")
-            remaining_promos = (await cursor.fetchone())[0]
+            for result in results:
+                if isinstance(result, Exception):
+                    failed_from_woo += 1
+                    _report(progress, f"   ✗ Ошибка удаления из WooCommerce: {result}")
+                    continue
+                
+                promo_code, success = result
+                if success:
+                    deleted_from_woo += 1
+                    _report(progress, f"   ✓ Удален из WooCommerce: {promo_code}")
+                else:
+                    failed_from_woo += 1
+                    _report(progress, f"   ✗ Не удалось удалить из WooCommerce: {promo_code}")
             
-            cursor = await db.execute("SELECT COUNT(*) FROM users")
-            remaining_users = (await cursor.fetchone())[0]
+            _flush_progress(progress)
             
-            print("\n✅ Очистка завершена!")
-            print(f"\n📊 Итоговая статистика:")
-            print(f"   Пользователей: {remaining_users} (сохранено)")
-            print(f"   Промокодов в локальной БД: {remaining_promos}")
-            print(f"   Удалено промокодов из локальной БД: {total_promos}")
-            print(f"\n⚙️  Новые настройки промокодов:")
-            print(f"   Скидка: 13%")
-            print(f"   Срок действия: 7 дней")
-            print("\nℹ️  Примечание: Все пользователи (включая администраторов) могут получить новые промокоды")
+            print(f"\n   Удалено из WooCommerce: {deleted_from_woo}")
+            if failed_from_woo > 0:
+                print(f"   ⚠️  Не удалось удалить из WooCommerce: {failed_from_woo}")
+        else:
+            print("\nℹ️  WooCommerce интеграция отключена - пропуск удаления с сайта")
+        
+        remaining_promos = stats["remaining_promos"]
+        
+        # Пользователи не удаляются, повторный подсчет не нужен
+        remaining_users = total_users
+        
+        print("\n✅ Очистка завершена!")
+        print(f"\n📊 Итоговая статистика:")
+        print(f"   Пользователей: {remaining_users} (сохранено)")
+        print(f"   Промокодов в локальной БД: {remaining_promos}")
+        print(f"   Удалено промокодов из локальной БД: {total_promos}")
+        print(f"\n⚙️  Новые настройки промокодов:")
+        print(f"   Скидка: 13%")
+        print(f"   Срок действия: 7 дней")
+        print("\nℹ️  Примечание: Все пользователи (включая администраторов) могут получить новые промокоды")
             
     except Exception as e:
         print(f"\n❌ Ошибка при очистке данных: {e}")
@@ -108,16 +205,37 @@ async def clear_promo_data():
     return True
 
 
+def parse_args():
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--yes", action="store_true",
+                        help="не запрашивать подтверждение (для запуска из cron/CI)")
+    parser.add_argument("--concurrency", type=int, default=WOO_CONCURRENCY,
+                        help=f"одновременных запросов к WooCommerce (по умолчанию {WOO_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=WOO_RATE_PER_SEC,
+                        help=f"запросов к WooCommerce в секунду (по умолчанию {WOO_RATE_PER_SEC})")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace):
+    """Запуск очистки с общим HTTP клиентом WooCommerce на все время работы"""
+    async with woo_manager:
+        return await clear_promo_data(concurrency=args.concurrency, rate=args.rate)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    
     print("\n⚠️  ВНИМАНИЕ! Этот скрипт удалит ВСЕ данные о промокодах!")
     print("   - Будут удалены все промокоды всех пользователей")
     print("   - Данные о пользователях (регистрация, активность) сохранятся")
     print("   - Настройки промокодов обновятся до 13% и 7 дней")
     
-    confirm = input("\nПродолжить? (введите 'ДА' для подтверждения): ")
+    if not args.yes:
+        confirm = input("\nПродолжить? (введите 'ДА' для подтверждения): ")
+        if confirm.strip().upper() != "ДА":
+            print("\n❌ Операция отменена пользователем")
+            sys.exit(1)
     
-    if confirm.strip().upper() == "ДА":
-        asyncio.run(clear_promo_data())
-    else:
-        print("\n❌ Операция отменена пользователем")
+    sys.exit(0 if asyncio.run(main(args)) else 1)
 
@@ -4,13 +4,48 @@
 Используйте этот скрипт если нужно очистить промокоды только на сайте
 """
 
+import argparse
 import asyncio
-import aiosqlite
+import sys
+from database.database import get_db
 from utils.config import Config
+from utils.ratelimit import AsyncTokenBucket
 from utils.woocommerce import woo_manager
 
-async def clear_woocommerce_coupons():
-    """Удалить все промокоды из WooCommerce"""
+# Параметры параллельного удаления из WooCommerce
+WOO_CONCURRENCY = 10  # Одновременных запросов
+WOO_RATE_PER_SEC = 10.0  # Запросов в секунду (общий лимит)
+PROGRESS_FLUSH_EVERY = 50  # Строк прогресса в одном выводе
+
+
+def _report(progress: list, line: str):
+    """Добавить строку прогресса и вывести буфер, когда он заполнится"""
+    progress.append(line)
+    if len(progress) >= PROGRESS_FLUSH_EVERY:
+        _flush_progress(progress)
+
+
+def _flush_progress(progress: list):
+    """Вывести накопленные строки прогресса одним вызовом print"""
+    if progress:
+        print("\n".join(progress))
+        progress.clear()
+
+
+async def _delete_one(sem: asyncio.Semaphore, bucket: AsyncTokenBucket, code: str):
+    """Удалить один купон из WooCommerce с учетом ограничений"""
+    async with sem:
+        return code, await woo_manager.delete_coupon(code, rate_limiter=bucket)
+
+
+async def clear_woocommerce_coupons(concurrency: int = WOO_CONCURRENCY, rate: float = WOO_RATE_PER_SEC):
+    """
+    Удалить все промокоды из WooCommerce
+    
+    Args:
+        concurrency: Максимум одновременных запросов к WooCommerce
+        rate: Максимум запросов к WooCommerce в секунду
+    """
     
     print("=" * 50)
     print("УДАЛЕНИЕ ПРОМОКОДОВ ИЗ WOOCOMMERCE")
@@ -27,80 +62,120 @@ async def clear_woocommerce_coupons():
         print("   Проверьте настройки в файле .env")
         return False
     
+    database = get_db()
+    
     try:
-        db_path = Config.DB_PATH
+        await database.init()
         
-        async with aiosqlite.connect(db_path) as db:
-            # Получаем все промокоды из локальной БД
-            cursor = await db.execute("""
-                SELECT code, woocommerce_synced, woocommerce_id 
-                FROM promocodes 
-                WHERE woocommerce_synced = 1
-            """)
-            synced_promos = await cursor.fetchall()
-            
-            if not synced_promos:
-                print("\n📭 Нет синхронизированных промокодов в локальной БД")
-                print("   Возможно промокоды уже удалены или не были синхронизированы")
-                return True
-            
-            print(f"\n📋 Найдено синхронизированных промокодов: {len(synced_promos)}")
-            print("\n🌐 Начинаю удаление промокодов из WooCommerce...")
-            
-            deleted_count = 0
-            failed_count = 0
-            
-            for promo_code, is_synced, woo_id in synced_promos:
-                try:
-                    print(f"\n   Удаление: {promo_code} (WooCommerce ID: {woo_id})...")
-                    success = await woo_manager.delete_coupon(promo_code)
-                    
-                    if success:
-                        deleted_count += 1
-                        print(f"   ✓ Удален: {promo_code}")
-                    else:
-                        failed_count += 1
-                        print(f"   ✗ Не удалось удалить: {promo_code}")
-                    
-                    # Небольшая задержка между запросами
-                    await asyncio.sleep(0.5)
-                    
-                except Exception as e:
-                    failed_count += 1
-                    print(f"   ✗ Ошибка удаления {promo_code}: {e}")
-            
-            print("\n" + "=" * 50)
-            print("РЕЗУЛЬТАТЫ УДАЛЕНИЯ")
-            print("=" * 50)
-            print(f"\n✅ Успешно удалено: {deleted_count}")
-            if failed_count > 0:
-                print(f"❌ Не удалось удалить: {failed_count}")
-            print(f"\nℹ️  Всего обработано: {len(synced_promos)}")
-            
-            if deleted_count > 0:
-                print("\n⚠️  ВАЖНО: Промокоды удалены только из WooCommerce!")
-                print("   Они все еще остаются в локальной базе данных бота.")
-                print("   Для полной очистки используйте: python3 clear_promo_data.py")
-            
+        # Получаем синхронизированные промокоды из локальной БД (покрывающий индекс)
+        synced_promos = await database.manager.fetchall("""
+            SELECT code, woocommerce_id
+            FROM promocodes
+            WHERE woocommerce_synced = 1
+        """)
+        
+        if not synced_promos:
+            print("\n📭 Нет синхронизированных промокодов в локальной БД")
+            print("   Возможно промокоды уже удалены или не были синхронизированы")
             return True
+        
+        print(f"\n📋 Найдено синхронизированных промокодов: {len(synced_promos)}")
+        print("\n🌐 Начинаю удаление промокодов из WooCommerce...")
+        
+        deleted_count = 0
+        failed_count = 0
+        progress = []
+        
+        # Общий лимит частоты для всех запросов к WooCommerce (пакетных и одиночных)
+        sem = asyncio.Semaphore(concurrency)
+        bucket = AsyncTokenBucket(rate, burst=concurrency)
+        
+        # Купоны с известным ID удаляем пакетно, остальные - по одному
+        codes_by_id = {woo_id: promo_code for promo_code, woo_id in synced_promos if woo_id}
+        codes_without_id = [promo_code for promo_code, woo_id in synced_promos if not woo_id]
+        
+        batch_result = await woo_manager.delete_coupons_batch(list(codes_by_id), rate_limiter=bucket)
+        for woo_id in batch_result["deleted"]:
+            deleted_count += 1
+            _report(progress, f"   ✓ Удален: {codes_by_id[woo_id]}")
+        for woo_id in batch_result["failed"]:
+            failed_count += 1
+            _report(progress, f"   ✗ Не удалось удалить: {codes_by_id[woo_id]}")
+        
+        tasks = [_delete_one(sem, bucket, promo_code) for promo_code in codes_without_id]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for result in results:
+            if isinstance(result, Exception):
+                failed_count += 1
+                _report(progress, f"   ✗ Ошибка удаления: {result}")
+                continue
+            
+            promo_code, success = result
+            if success:
+                deleted_count += 1
+                _report(progress, f"   ✓ Удален: {promo_code}")
+            else:
+                failed_count += 1
+                _report(progress, f"   ✗ Не удалось удалить: {promo_code}")
+        
+        _flush_progress(progress)
+        
+        print("\n" + "=" * 50)
+        print("РЕЗУЛЬТАТЫ УДАЛЕНИЯ")
+        print("=" * 50)
+        print(f"\n✅ Успешно удалено: {deleted_count}")
+        if failed_count > 0:
+            print(f"❌ Не удалось удалить: {failed_count}")
+        print(f"\nℹ️  Всего обработано: {len(synced_promos)}")
+        
+        if deleted_count > 0:
+            print("\n⚠️  ВАЖНО: Промокоды удалены только из WooCommerce!")
+            print("   Они все еще остаются в локальной базе данных бота.")
+            print("   Для полной очистки используйте: python3 clear_promo_data.py")
+        
+        return True
             
     except Exception as e:
         print(f"\n❌ Ошибка при удалении промокодов: {e}")
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        await database.close()
+
+
+def parse_args():
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--yes", action="store_true",
+                        help="не запрашивать подтверждение (для запуска из cron/CI)")
+    parser.add_argument("--concurrency", type=int, default=WOO_CONCURRENCY,
+                        help=f"одновременных запросов к WooCommerce (по умолчанию {WOO_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=WOO_RATE_PER_SEC,
+                        help=f"запросов к WooCommerce в секунду (по умолчанию {WOO_RATE_PER_SEC})")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace):
+    """Запуск очистки с общим HTTP клиентом WooCommerce на все время работы"""
+    async with woo_manager:
+        return await clear_woocommerce_coupons(concurrency=args.concurrency, rate=args.rate)
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    
     print("\n⚠️  ВНИМАНИЕ! Этот скрипт удалит ВСЕ промокоды из WooCommerce (сайта)!")
     print("   - Будут удалены все синхронизированные промокоды с сайта")
     print("   - Промокоды останутся в локальной базе данных бота")
     print("   - Для полной очистки используйте: python3 clear_promo_data.py")
     
-    confirm = input("\nПродолжить удаление? (введите 'ДА' для подтверждения): ")
+    if not args.yes:
+        confirm = input("\nПродолжить удаление? (введите 'ДА' для подтверждения): ")
+        if confirm.strip().upper() != "ДА":
+            print("\n❌ Операция отменена пользователем")
+            sys.exit(1)
     
-    if confirm.strip().upper() == "ДА":
-        asyncio.run(clear_woocommerce_coupons())
-    else:
-        print("\n❌ Операция отменена пользователем")
+    sys.exit(0 if asyncio.run(main(args)) else 1)
 
@@ -2,7 +2,11 @@
 Основной модуль для работы с базой данных
 """
 
+import functools
+from typing import Optional
+
 from .models import DatabaseManager, User, PromoCode, Analytics, Settings
+from utils.config import Config
 
 
 class Database:
@@ -11,14 +15,33 @@ class Database:
     def __init__(self, db_path: str = "bot_database.db"):
         self.manager = DatabaseManager(db_path)
         self.user = User(self.manager)
-        self.promo = PromoCode(self.manager)
-        self.analytics = Analytics(self.manager)
         self.settings = Settings(self.manager)
+        self.promo = PromoCode(self.manager, self.settings)
+        self.analytics = Analytics(self.manager)
     
     async def init(self):
         """Инициализация базы данных"""
         await self.manager.init_database()
+        await self.settings.prime()
+        await self.promo.prime_feedback_pending()
+    
+    async def close(self):
+        """Закрыть соединение с базой данных"""
+        await self.promo.close()
+        await self.analytics.close()
+        await self.manager.close()
+
+
+def get_db(path: Optional[str] = None) -> Database:
+    """
+    Получить общий экземпляр базы данных (создается при первом обращении)
+    
+    Args:
+        path: Путь к файлу БД (по умолчанию Config.DB_PATH)
+    """
+    return _get_db(path or Config.DB_PATH)
 
 
-# Создаем экземпляр базы данных
-db = Database()
+@functools.lru_cache(maxsize=None)
+def _get_db(path: str) -> Database:
+    return Database(path)
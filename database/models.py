@@ -2,29 +2,382 @@
 Модели базы данных для телеграм бота PlummyPromo
 """
 
+import asyncio
+import functools
+import json
+import os
 import sqlite3
+import time
 import aiosqlite
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Set, Tuple, AsyncIterator
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# PRAGMA, применяемые к каждому новому соединению
+# (auto_vacuum и journal_mode=WAL сохраняются в файле БД, остальные действуют на соединение;
+# auto_vacuum применяется только к пустой БД и должен идти до включения WAL)
+CONNECTION_PRAGMAS = (
+    "auto_vacuum=INCREMENTAL",
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "cache_size=-65536",  # 64 МБ кэша страниц
+    "mmap_size=268435456",  # 256 МБ memory-mapped I/O (общий для всех соединений через кэш ОС)
+    "temp_store=MEMORY",
+)
+
+# Повтор записи, если БД заблокирована другим процессом дольше busy_timeout
+WRITE_RETRIES = 3
+WRITE_RETRY_BASE_DELAY = 0.01  # Секунды; удваивается с каждой попыткой
+
+# Соединения только для чтения не могут менять режим журнала и автоочистки
+READ_ONLY_PRAGMAS = tuple(
+    p for p in CONNECTION_PRAGMAS if not p.startswith(("journal_mode", "auto_vacuum"))
+)
+
+# Количество соединений на чтение в пуле (не меньше двух, чтобы одно долгое чтение не блокировало остальные)
+READ_POOL_SIZE = max(2, min(8, os.cpu_count() or 2))
+
+# Размер кэша скомпилированных выражений sqlite3 на каждое соединение
+STATEMENT_CACHE_SIZE = 256
+
+
+def prepared(sql: str) -> str:
+    """
+    Вернуть канонический текст SQL выражения для SQL_* констант
+    
+    Скомпилированные выражения кэширует сам sqlite3 (cached_statements=STATEMENT_CACHE_SIZE)
+    по тексту запроса, поэтому повторяющиеся запросы передаются одной константой с параметрами.
+    """
+    return sql.strip()
+
+
+# Сохранение настройки (ключ, значение, дата обновления)
+SQL_UPSERT_SETTING = prepared("""
+    INSERT OR REPLACE INTO bot_settings (key, value)
+    VALUES (?, ?)
+""")
+
+# Частые запросы к пользователям и промокодам
+SQL_SELECT_USER = prepared("SELECT * FROM users WHERE user_id = ?")
+SQL_TOUCH_USER = prepared("UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE user_id = ?")
+SQL_INSERT_USER = prepared("""
+    INSERT INTO users (user_id, username, first_name, last_name, referral_source)
+    VALUES (?, ?, ?, ?, ?)
+    RETURNING *
+""")
+# Страница активных пользователей после указанного user_id (поиск по первичному ключу)
+SQL_SELECT_ACTIVE_USERS_PAGE = prepared("""
+    SELECT * FROM users 
+    WHERE is_blocked = 0 AND notifications_enabled = 1 AND user_id > ?
+    ORDER BY user_id
+    LIMIT ?
+""")
+SQL_COUNT_ACTIVE_USERS = prepared(
+    "SELECT COUNT(*) FROM users WHERE is_blocked = 0 AND notifications_enabled = 1"
+)
+SQL_INSERT_PROMO = prepared("""
+    INSERT OR IGNORE INTO promocodes (code, user_id, discount_percent)
+    VALUES (?, ?, ?)
+    RETURNING id
+""")
+SQL_MARK_PROMO_SYNCED = prepared("""
+    UPDATE promocodes 
+    SET woocommerce_id = ?, woocommerce_synced = 1 
+    WHERE id = ?
+""")
+SQL_MARK_PROMO_SYNC_ERROR = prepared("""
+    UPDATE promocodes 
+    SET sync_error = ?, woocommerce_synced = 0
+    WHERE id = ?
+""")
+SQL_SELECT_USER_PROMOS = prepared("""
+    SELECT * FROM promocodes 
+    WHERE user_id = ? 
+    ORDER BY created_date DESC
+""")
+SQL_SELECT_USER_PROMO_STATE = prepared("""
+    SELECT code, is_used, discount_percent, created_date, woocommerce_id
+    FROM promocodes 
+    WHERE user_id = ? 
+    ORDER BY created_date DESC
+""")
+# Последний промокод с запрошенной и еще не полученной обратной связью
+SQL_SELECT_PENDING_FEEDBACK_CODE = prepared("""
+    SELECT p.code FROM promocodes p
+    LEFT JOIN feedback f ON f.user_id = p.user_id AND f.promo_code = p.code
+    WHERE p.user_id = ? AND p.feedback_requested = 1 AND p.is_used = 0
+    AND f.promo_code IS NULL
+    ORDER BY p.feedback_request_date DESC
+    LIMIT 1
+""")
+SQL_SELECT_PENDING_FEEDBACK_USERS = prepared("""
+    SELECT DISTINCT p.user_id FROM promocodes p
+    LEFT JOIN feedback f ON f.user_id = p.user_id AND f.promo_code = p.code
+    WHERE p.feedback_requested = 1 AND p.is_used = 0
+    AND f.promo_code IS NULL
+""")
+SQL_MARK_FEEDBACK_REQUESTED = prepared("""
+    UPDATE promocodes 
+    SET feedback_requested = 1, feedback_request_date = ?
+    WHERE code = ?
+""")
+SQL_INSERT_FEEDBACK = prepared("""
+    INSERT INTO feedback (user_id, promo_code, feedback_text)
+    VALUES (?, ?, ?)
+""")
+SQL_USE_PROMO = prepared("""
+    UPDATE promocodes 
+    SET is_used = 1, used_date = CURRENT_TIMESTAMP, order_id = ?
+    WHERE code = ? AND is_used = 0
+    RETURNING woocommerce_id
+""")
+SQL_SELECT_UNSYNCED_PROMOS = prepared("""
+    SELECT * FROM promocodes 
+    WHERE woocommerce_synced = 0
+    ORDER BY created_date DESC
+    LIMIT ?
+""")
+SQL_GET_SETTING = prepared("SELECT value FROM bot_settings WHERE key = ?")
+
+# Попыток сгенерировать свободный код промокода
+PROMO_CODE_MAX_ATTEMPTS = 5
+
+# Строк в одной странице при постраничном чтении пользователей
+USERS_FETCH_SIZE = 256
+
+# Пакетная запись действий пользователей (user_sessions)
+BULK_RECORDER_SIZE = 500  # Строк в пакете, после которых запись выполняется сразу
+BULK_RECORDER_MAX_ROWS_PER_INSERT = 1000  # Максимум строк в одном executemany
+FLUSH_TIMEOUT_MS = 100  # Максимальная задержка записи действия
+
+SQL_INSERT_SESSION = prepared("""
+    INSERT INTO user_sessions (user_id, action_type, referral_source, utm_source, utm_medium, utm_campaign)
+    VALUES (?, ?, ?, ?, ?, ?)
+""")
+
+# Время жизни кэша настроек в памяти процесса (секунды)
+SETTINGS_CACHE_TTL = 60
+
+# Настройки промокодов хранятся одной JSON записью: {"discount": 13, "duration_days": 7}
+PROMO_DEFAULTS_KEY = 'promo_defaults'
+# Отдельные ключи прежнего формата (переносятся в PROMO_DEFAULTS_KEY при инициализации)
+LEGACY_PROMO_KEYS = {
+    'promo_discount_percent': 'discount',
+    'promo_duration_days': 'duration_days',
+}
+
+
+# Добавление настройки, только если ее еще нет
+SQL_INSERT_DEFAULT_SETTING = prepared("""
+    INSERT OR IGNORE INTO bot_settings (key, value)
+    VALUES (?, ?)
+""")
+
+# Перенос ключей прежнего формата в JSON запись (строка появляется, только если старые ключи есть)
+SQL_MIGRATE_LEGACY_PROMO_SETTINGS = prepared("""
+    INSERT OR IGNORE INTO bot_settings (key, value)
+    SELECT ?, json_object(
+        'discount', COALESCE(CAST(MAX(CASE WHEN key = 'promo_discount_percent' THEN value END) AS INTEGER), ?),
+        'duration_days', COALESCE(CAST(MAX(CASE WHEN key = 'promo_duration_days' THEN value END) AS INTEGER), ?)
+    )
+    FROM bot_settings
+    WHERE key IN ('promo_discount_percent', 'promo_duration_days')
+    HAVING COUNT(*) > 0
+""")
+
+
+def encode_promo_defaults(values: Dict[str, int]) -> str:
+    """Сериализовать настройки промокодов для записи в bot_settings"""
+    return json.dumps(values, sort_keys=True)
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_promo_defaults(value: str) -> Tuple[Tuple[str, Any], ...]:
+    """Разобрать JSON запись настроек (результат кэшируется по тексту записи)"""
+    try:
+        data = json.loads(value)
+    except ValueError:
+        logger.error(f"Некорректное значение настроек промокодов: {value}")
+        return ()
+    return tuple(data.items()) if isinstance(data, dict) else ()
+
+
+def decode_promo_defaults(value: Optional[str]) -> Dict[str, int]:
+    """Разобрать JSON запись настроек промокодов (пустой словарь при ошибке)"""
+    if not value:
+        return {}
+    # Каждый вызов получает собственный словарь: вызывающий код может его изменять
+    return dict(_parse_promo_defaults(value))
+
+
+async def configure_connection(conn: aiosqlite.Connection, pragmas=CONNECTION_PRAGMAS):
+    """Применить PRAGMA производительности к соединению"""
+    for pragma in pragmas:
+        await conn.execute(f"PRAGMA {pragma}")
+
+
+class ConnectionPool:
+    """Пул соединений: один писатель и несколько читателей (WAL)"""
+    
+    def __init__(self, db_path: str, read_pool_size: int = READ_POOL_SIZE):
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self.writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._read_queue: Optional[asyncio.Queue] = None
+        # SQLite допускает только одного писателя
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+    
+    async def open(self):
+        """Открыть соединения (один раз за время жизни процесса)"""
+        async with self._open_lock:
+            if self.writer is not None:
+                return
+            
+            # Писатель открывается первым: он создает файл БД и включает WAL
+            writer = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+            await configure_connection(writer)
+            
+            read_uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            read_queue = asyncio.Queue()
+            for _ in range(self.read_pool_size):
+                reader = await aiosqlite.connect(read_uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+                await configure_connection(reader, READ_ONLY_PRAGMAS)
+                # Строки читателей доступны и по индексу, и по имени колонки (dict(row))
+                reader.row_factory = aiosqlite.Row
+                self._readers.append(reader)
+                read_queue.put_nowait(reader)
+            
+            self._read_queue = read_queue
+            self.writer = writer
+    
+    @asynccontextmanager
+    async def acquire_read(self):
+        """Взять соединение на чтение из пула"""
+        await self.open()
+        conn = await self._read_queue.get()
+        try:
+            yield conn
+        finally:
+            self._read_queue.put_nowait(conn)
+    
+    @asynccontextmanager
+    async def acquire_write(self):
+        """Получить единственное соединение на запись"""
+        await self.open()
+        async with self._write_lock:
+            try:
+                yield self.writer
+            except BaseException:
+                # Незафиксированные изменения не должны попасть в транзакцию следующего писателя
+                await self.writer.rollback()
+                raise
+    
+    async def close(self):
+        """Закрыть все соединения пула"""
+        for conn in self._readers:
+            await conn.close()
+        self._readers = []
+        self._read_queue = None
+        
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+
 
 class DatabaseManager:
     """Менеджер для работы с базой данных"""
     
     def __init__(self, db_path: str = "bot_database.db"):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path)
+    
+    async def connect(self) -> None:
+        """Открыть пул соединений (писатель наружу не выдается: запись - через acquire_write/execute)"""
+        await self.pool.open()
+    
+    @asynccontextmanager
+    async def get_connection(self):
+        """Получить соединение на запись (под блокировкой писателя, как acquire_write)"""
+        async with self.pool.acquire_write() as conn:
+            yield conn
+    
+    def acquire_read(self):
+        """Соединение на чтение из пула"""
+        return self.pool.acquire_read()
+    
+    def acquire_write(self):
+        """Соединение на запись (под блокировкой писателя)"""
+        return self.pool.acquire_write()
+    
+    async def fetchone(self, sql: str, parameters=()):
+        """Выполнить запрос на чтение и вернуть первую строку"""
+        async with self.pool.acquire_read() as conn:
+            async with conn.execute(sql, parameters) as cursor:
+                return await cursor.fetchone()
+    
+    async def fetchall(self, sql: str, parameters=()):
+        """Выполнить запрос на чтение и вернуть все строки"""
+        async with self.pool.acquire_read() as conn:
+            async with conn.execute(sql, parameters) as cursor:
+                return await cursor.fetchall()
     
-    def get_connection(self):
-        """Получить соединение с базой данных"""
-        return aiosqlite.connect(self.db_path)
+    async def _execute_write(self, sql: str, parameters=(), retries: int = WRITE_RETRIES,
+                             many: bool = False, fetch: bool = False):
+        """
+        Выполнить запрос на запись с повтором при блокировке БД
+        
+        Args:
+            sql: Текст запроса
+            parameters: Параметры (для many=True - последовательность наборов параметров)
+            retries: Количество попыток
+            many: Выполнить через executemany
+            fetch: Вернуть строки запроса (RETURNING), прочитанные до фиксации транзакции
+        """
+        for attempt in range(retries):
+            try:
+                # При ошибке acquire_write откатывает транзакцию
+                async with self.pool.acquire_write() as conn:
+                    if many:
+                        cursor = await conn.executemany(sql, parameters)
+                    else:
+                        cursor = await conn.execute(sql, parameters)
+                    rows = await cursor.fetchall() if fetch else None
+                    await conn.commit()
+                    return rows if fetch else cursor
+            except sqlite3.OperationalError as e:
+                if "database is locked" not in str(e) or attempt == retries - 1:
+                    raise
+                logger.warning(f"⚠️ БД заблокирована, повтор записи ({attempt + 1}/{retries})")
+                # Ждем вне блокировки писателя, чтобы не задерживать остальные записи
+                await asyncio.sleep(WRITE_RETRY_BASE_DELAY * 2 ** attempt)
+    
+    async def execute(self, sql: str, parameters=()) -> aiosqlite.Cursor:
+        """Выполнить запрос на запись и зафиксировать транзакцию"""
+        return await self._execute_write(sql, parameters)
+    
+    async def executemany(self, sql: str, parameters) -> aiosqlite.Cursor:
+        """Выполнить пакетный запрос на запись одной транзакцией"""
+        return await self._execute_write(sql, parameters, many=True)
+    
+    async def execute_returning(self, sql: str, parameters=()) -> List[aiosqlite.Row]:
+        """Выполнить запрос на запись с RETURNING и вернуть полученные строки"""
+        return await self._execute_write(sql, parameters, fetch=True)
+    
+    async def close(self):
+        """Закрыть все соединения"""
+        await self.pool.close()
     
     async def init_database(self):
         """Инициализация базы данных и создание таблиц"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire_write() as db:
             # Таблица пользователей
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -100,7 +453,7 @@ class DatabaseManager:
                     key TEXT PRIMARY KEY,
                     value TEXT NOT NULL,
                     updated_date DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
+                ) WITHOUT ROWID
             """)
             
             # Таблица обратной связи
@@ -115,6 +468,30 @@ class DatabaseManager:
                 )
             """)
             
+            # Частичный покрывающий индекс для выборки синхронизированных промокодов
+            # (code, woocommerce_id читаются из индекса без обращения к таблице)
+            await db.execute("DROP INDEX IF EXISTS idx_promo_synced")
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_promo_cleanup
+                ON promocodes(woocommerce_synced, code, woocommerce_id) WHERE woocommerce_synced = 1
+            """)
+            
+            # Индексы для выборок по пользователю, несинхронизированных промокодов и статистики
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_promocodes_user_id ON promocodes(user_id)")
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_promocodes_unsynced
+                ON promocodes(woocommerce_synced) WHERE woocommerce_synced = 0
+            """)
+            # Промокоды, ожидающие обратной связи, и проверка уже полученной обратной связи
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_promocodes_feedback
+                ON promocodes(user_id, feedback_request_date) WHERE feedback_requested = 1 AND is_used = 0
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_feedback_user_code ON feedback(user_id, promo_code)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_date ON user_sessions(user_id, session_date)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_action ON user_sessions(action_type)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_date ON user_sessions(session_date)")
+            
             await db.commit()
             
             # Инициализируем настройки по умолчанию
@@ -123,26 +500,30 @@ class DatabaseManager:
     async def _init_default_settings(self, db):
         """Инициализировать настройки по умолчанию если их нет"""
         try:
-            from datetime import datetime
-            
             # Настройки по умолчанию
+            promo_defaults = {
+                'discount': 5,       # 5% скидка
+                'duration_days': 7   # 7 дней действие
+            }
             default_settings = {
-                'promo_discount_percent': '5',  # 5% скидка
-                'promo_duration_days': '7'       # 7 дней действие
+                PROMO_DEFAULTS_KEY: encode_promo_defaults(promo_defaults),
             }
+            # Переносим значения из отдельных ключей прежнего формата (если они есть)
+            await db.execute(SQL_MIGRATE_LEGACY_PROMO_SETTINGS, (
+                PROMO_DEFAULTS_KEY, promo_defaults['discount'], promo_defaults['duration_days']
+            ))
             
-            for key, value in default_settings.items():
-                # Проверяем, есть ли настройка
-                cursor = await db.execute("SELECT value FROM bot_settings WHERE key = ?", (key,))
-                existing = await cursor.fetchone()
-                
-                if not existing:
-                    # Добавляем настройку по умолчанию
-                    await db.execute("""
-                        INSERT INTO bot_settings (key, value, updated_date)
-                        VALUES (?, ?, ?)
-                    """, (key, value, datetime.now().isoformat()))
-                    logger.info(f"✅ Установлена настройка по умолчанию: {key} = {value}")
+            # Добавляем недостающие настройки одним пакетом; существующие не трогаем
+            cursor = await db.executemany(SQL_INSERT_DEFAULT_SETTING, [
+                (key, value) for key, value in default_settings.items()
+            ])
+            if cursor.rowcount > 0:
+                logger.info(f"✅ Установлено настроек по умолчанию: {cursor.rowcount}")
+            
+            await db.execute(
+                f"DELETE FROM bot_settings WHERE key IN ({', '.join('?' * len(LEGACY_PROMO_KEYS))})",
+                tuple(LEGACY_PROMO_KEYS)
+            )
             
             await db.commit()
             
@@ -160,39 +541,32 @@ class User:
                                 first_name: str = None, last_name: str = None,
                                 referral_source: str = None) -> Dict[str, Any]:
         """Получить существующего пользователя или создать нового"""
-        async with aiosqlite.connect(self.db.db_path) as db:
+        async with self.db.acquire_write() as db:
             # Проверяем существование пользователя
-            async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
+            async with db.execute(SQL_SELECT_USER, (user_id,)) as cursor:
+                cursor.row_factory = aiosqlite.Row
                 user = await cursor.fetchone()
             
             if user:
                 # Обновляем последнюю активность
-                await db.execute(
-                    "UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE user_id = ?",
-                    (user_id,)
-                )
+                await db.execute(SQL_TOUCH_USER, (user_id,))
                 await db.commit()
                 
-                # Преобразуем в словарь
-                columns = [description[0] for description in cursor.description]
-                return dict(zip(columns, user))
+                return dict(user)
             else:
-                # Создаем нового пользователя
-                await db.execute("""
-                    INSERT INTO users (user_id, username, first_name, last_name, referral_source)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, username, first_name, last_name, referral_source))
+                # Создаем нового пользователя и сразу получаем созданную строку
+                async with db.execute(
+                    SQL_INSERT_USER, (user_id, username, first_name, last_name, referral_source)
+                ) as cursor:
+                    cursor.row_factory = aiosqlite.Row
+                    user = await cursor.fetchone()
                 await db.commit()
                 
-                # Возвращаем созданного пользователя
-                async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
-                    user = await cursor.fetchone()
-                    columns = [description[0] for description in cursor.description]
-                    return dict(zip(columns, user))
+                return dict(user)
     
     async def update_user_phone(self, user_id: int, phone: str) -> bool:
         """Обновить номер телефона пользователя"""
-        async with aiosqlite.connect(self.db.db_path) as db:
+        async with self.db.acquire_write() as db:
             await db.execute(
                 "UPDATE users SET phone = ? WHERE user_id = ?",
                 (phone, user_id)
@@ -200,32 +574,45 @@ class User:
             await db.commit()
             return True
     
+    async def iter_active_users(self) -> AsyncIterator[Dict[str, Any]]:
+        """Перебрать активных пользователей для рассылки страницами по USERS_FETCH_SIZE (по user_id)"""
+        last_user_id = -1
+        while True:
+            # Соединение берется только на время чтения страницы и возвращается в пул
+            # до передачи строк вызывающему коду (рассылка может идти долго)
+            rows = await self.db.fetchall(SQL_SELECT_ACTIVE_USERS_PAGE, (last_user_id, USERS_FETCH_SIZE))
+            for row in rows:
+                yield dict(row)
+            if len(rows) < USERS_FETCH_SIZE:
+                return
+            last_user_id = rows[-1]['user_id']
+    
     async def get_all_active_users(self) -> List[Dict[str, Any]]:
         """Получить всех активных пользователей для рассылки"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            async with db.execute("""
-                SELECT * FROM users 
-                WHERE is_blocked = 0 AND notifications_enabled = 1
-                ORDER BY registration_date DESC
-            """) as cursor:
-                users = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, user)) for user in users]
+        return [user async for user in self.iter_active_users()]
+    
+    async def get_active_users_count(self) -> int:
+        """Получить количество активных пользователей"""
+        result = await self.db.fetchone(SQL_COUNT_ACTIVE_USERS)
+        return result[0] if result else 0
     
     async def get_users_count(self) -> int:
         """Получить общее количество пользователей"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            async with db.execute("SELECT COUNT(*) FROM users") as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else 0
+        result = await self.db.fetchone("SELECT COUNT(*) FROM users")
+        return result[0] if result else 0
 
 
 class PromoCode:
     """Модель промокода"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, settings: "Settings" = None):
         self.db = db_manager
-        self._settings = None  # Будет инициализирован при первом обращении
+        # Общий экземпляр настроек (с кэшем); если не передан, создается при первом обращении
+        self._settings = settings
+        # Фоновые задачи синхронизации с WooCommerce по коду (ссылки держим до завершения)
+        self._sync_tasks: Dict[str, asyncio.Task] = {}
+        # Пользователи, от которых ожидается обратная связь (None - не загружено, проверяем по БД)
+        self._feedback_pending: Optional[Set[int]] = None
     
     async def create_promo_code(self, user_id: int, discount_percent: int = None, username: str = None) -> str:
         """Создать новый промокод для пользователя с интеграцией в WooCommerce"""
@@ -235,61 +622,41 @@ class PromoCode:
                 self._settings = Settings(self.db)
             discount_percent = await self._settings.get_promo_discount_percent()
             
-        # Генерируем уникальный код
-        code = f"PLUMMY{uuid.uuid4().hex[:6].upper()}"
-        
-        async with aiosqlite.connect(self.db.db_path) as db:
-            # Проверяем, что код уникальный
-            async with db.execute("SELECT id FROM promocodes WHERE code = ?", (code,)) as cursor:
-                existing = await cursor.fetchone()
-                if existing:
-                    # Если код существует, генерируем новый
-                    return await self.create_promo_code(user_id, discount_percent, username)
-            
-            # Создаем промокод локально сначала
-            await db.execute("""
-                INSERT INTO promocodes (code, user_id, discount_percent)
-                VALUES (?, ?, ?)
-            """, (code, user_id, discount_percent))
+        async with self.db.acquire_write() as db:
+            # Создаем промокод локально сначала; при совпадении кода
+            # (UNIQUE) вставка пропускается и код генерируется заново
+            for _ in range(PROMO_CODE_MAX_ATTEMPTS):
+                code = f"PLUMMY{uuid.uuid4().hex[:6].upper()}"
+                async with db.execute(SQL_INSERT_PROMO, (code, user_id, discount_percent)) as cursor:
+                    inserted = await cursor.fetchone()
+                if inserted:
+                    break
+            else:
+                raise RuntimeError(
+                    f"Не удалось сгенерировать уникальный промокод за {PROMO_CODE_MAX_ATTEMPTS} попыток"
+                )
             await db.commit()
             
             logger.info(f"✅ Промокод {code} создан локально для пользователя {user_id}")
             
-        # Пытаемся создать купон в WooCommerce 
+        # Пытаемся создать купон в WooCommerce (без удержания блокировки записи)
         try:
             woo_result = await self._create_woocommerce_coupon(code, user_id, discount_percent, username)
-            
-            # Обновляем статус синхронизации
-            async with aiosqlite.connect(self.db.db_path) as db:
-                if woo_result["success"]:
-                    await db.execute("""
-                        UPDATE promocodes 
-                        SET woocommerce_id = ?, woocommerce_synced = 1 
-                        WHERE code = ?
-                    """, (woo_result.get("woocommerce_id"), code))
-                    logger.info(f"✅ Промокод {code} синхронизирован с WooCommerce (ID: {woo_result.get('woocommerce_id')})")
-                else:
-                    await db.execute("""
-                        UPDATE promocodes 
-                        SET sync_error = ?, woocommerce_synced = 0
-                        WHERE code = ?
-                    """, (woo_result.get("error", "Unknown error"), code))
-                    logger.warning(f"⚠️ Промокод {code} создан локально, но не синхронизирован с WooCommerce: {woo_result.get('error')}")
-                
-                await db.commit()
-                
         except Exception as e:
             # При ошибке WooCommerce, промокод остается в локальной базе
             logger.error(f"❌ Ошибка синхронизации промокода {code} с WooCommerce: {str(e)}")
+            woo_result = {"success": False, "error": str(e)}
+        
+        # Обновляем статус синхронизации одной записью по первичному ключу
+        async with self.db.acquire_write() as db:
+            if woo_result["success"]:
+                await db.execute(SQL_MARK_PROMO_SYNCED, (woo_result.get("woocommerce_id"), inserted[0]))
+                logger.info(f"✅ Промокод {code} синхронизирован с WooCommerce (ID: {woo_result.get('woocommerce_id')})")
+            else:
+                await db.execute(SQL_MARK_PROMO_SYNC_ERROR, (woo_result.get("error", "Unknown error"), inserted[0]))
+                logger.warning(f"⚠️ Промокод {code} создан локально, но не синхронизирован с WooCommerce: {woo_result.get('error')}")
             
-            # Отмечаем ошибку синхронизации
-            async with aiosqlite.connect(self.db.db_path) as db:
-                await db.execute("""
-                    UPDATE promocodes 
-                    SET sync_error = ?, woocommerce_synced = 0
-                    WHERE code = ?
-                """, (str(e), code))
-                await db.commit()
+            await db.commit()
         
         return code
     
@@ -325,121 +692,196 @@ class PromoCode:
     
     async def get_user_promo_codes(self, user_id: int) -> List[Dict[str, Any]]:
         """Получить все промокоды пользователя"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            async with db.execute("""
-                SELECT * FROM promocodes 
-                WHERE user_id = ? 
-                ORDER BY created_date DESC
-            """, (user_id,)) as cursor:
+        async with self.db.acquire_read() as db:
+            async with db.execute(SQL_SELECT_USER_PROMOS, (user_id,)) as cursor:
                 codes = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, code)) for code in codes]
+                return [dict(row) for row in codes]
+    
+    async def get_user_promo_state(self, user_id: int) -> Dict[str, Any]:
+        """
+        Состояние промокодов пользователя одним запросом
+        
+        Returns:
+            {"used": [...], "active": [...], "duration_days": int}; у активных
+            промокодов заполнено expiry_date - срок по настройкам бота
+        """
+        if self._settings is None:
+            self._settings = Settings(self.db)
+        # Срок действия берется из кэша настроек один раз на весь список
+        duration = timedelta(days=await self._settings.get_promo_duration_days())
+        
+        used, active = [], []
+        async with self.db.acquire_read() as db:
+            async with db.execute(SQL_SELECT_USER_PROMO_STATE, (user_id,)) as cursor:
+                rows = await cursor.fetchall()
+        
+        for row in rows:
+            code = dict(row)
+            if code['is_used']:
+                used.append(code)
+            else:
+                created_date = datetime.fromisoformat(code['created_date'][:19])
+                code['expiry_date'] = created_date + duration
+                active.append(code)
+        
+        return {"used": used, "active": active, "duration_days": duration.days}
+    
+    async def prime_feedback_pending(self):
+        """Загрузить пользователей, ожидающих обратной связи, одним запросом (при старте бота)"""
+        rows = await self.db.fetchall(SQL_SELECT_PENDING_FEEDBACK_USERS)
+        self._feedback_pending = {row[0] for row in rows}
+        logger.info(f"✅ Ожидается обратная связь от пользователей: {len(self._feedback_pending)}")
+    
+    async def request_feedback(self, user_id: int, code: str):
+        """Отметить, что по промокоду запрошена обратная связь"""
+        await self.db.execute(SQL_MARK_FEEDBACK_REQUESTED, (datetime.now().isoformat(), code))
+        if self._feedback_pending is not None:
+            self._feedback_pending.add(user_id)
+    
+    async def get_pending_feedback_code(self, user_id: int) -> Optional[str]:
+        """Промокод, по которому у пользователя запрошена обратная связь и ответа еще не было"""
+        # Для большинства сообщений обратная связь не ожидается - обходимся без запроса к БД
+        if self._feedback_pending is not None and user_id not in self._feedback_pending:
+            return None
+        
+        row = await self.db.fetchone(SQL_SELECT_PENDING_FEEDBACK_CODE, (user_id,))
+        if row is None:
+            # Обратная связь получена или промокод использован
+            if self._feedback_pending is not None:
+                self._feedback_pending.discard(user_id)
+            return None
+        return row[0]
+    
+    async def save_feedback(self, user_id: int, promo_code: str, feedback_text: str):
+        """Сохранить обратную связь пользователя по промокоду"""
+        # Запись обратной связи и проверка оставшихся запросов - одна транзакция
+        async with self.db.acquire_write() as db:
+            await db.execute(SQL_INSERT_FEEDBACK, (user_id, promo_code, feedback_text))
+            async with db.execute(SQL_SELECT_PENDING_FEEDBACK_CODE, (user_id,)) as cursor:
+                still_pending = await cursor.fetchone()
+            await db.commit()
+        
+        # Больше обратной связи от пользователя не ожидается
+        if still_pending is None and self._feedback_pending is not None:
+            self._feedback_pending.discard(user_id)
     
     async def use_promo_code(self, code: str, order_id: str = None) -> bool:
         """Отметить промокод как использованный"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            result = await db.execute("""
-                UPDATE promocodes 
-                SET is_used = 1, used_date = CURRENT_TIMESTAMP, order_id = ?
-                WHERE code = ? AND is_used = 0
-            """, (order_id, code))
-            await db.commit()
-            
-            success = result.rowcount > 0
-            
-            # Если промокод успешно отмечен как использованный в локальной базе,
-            # попытаемся синхронизировать с WooCommerce
-            if success:
-                try:
-                    from utils.woocommerce import woo_manager
-                    woo_result = await woo_manager.mark_coupon_as_used(code)
-                    if woo_result["success"]:
-                        logger.info(f"✅ Промокод {code} отмечен как использованный в WooCommerce")
-                    else:
-                        logger.warning(f"⚠️ Промокод {code} отмечен в локальной базе, но не синхронизирован с WooCommerce: {woo_result.get('error')}")
-                except Exception as e:
-                    logger.error(f"Ошибка при синхронизации промокода {code} с WooCommerce: {str(e)}")
-            
-            return success
+        # Проверка и отметка одним запросом; пустой результат - промокод не найден или уже использован
+        rows = await self.db.execute_returning(SQL_USE_PROMO, (order_id, code))
+        success = bool(rows)
+        
+        # Если промокод успешно отмечен как использованный в локальной базе,
+        # синхронизируем с WooCommerce в фоне, не задерживая ответ пользователю
+        if success:
+            task = asyncio.create_task(self._sync_used_to_woo(code, rows[0][0]))
+            self._sync_tasks[code] = task
+            task.add_done_callback(lambda done: self._sync_tasks.pop(code, None))
+        
+        return success
+    
+    def get_woo_sync_task(self, code: str) -> Optional[asyncio.Task]:
+        """Фоновая синхронизация промокода с WooCommerce (None, если не запускалась или завершена)"""
+        return self._sync_tasks.get(code)
+    
+    async def _sync_used_to_woo(self, code: str, woocommerce_id: int = None) -> Dict[str, Any]:
+        """Отметить промокод как использованный в WooCommerce"""
+        try:
+            from utils.woocommerce import woo_manager
+            woo_result = await woo_manager.mark_coupon_as_used(code, coupon_id=woocommerce_id)
+            if woo_result["success"]:
+                logger.info(f"✅ Промокод {code} отмечен как использованный в WooCommerce")
+            else:
+                logger.warning(f"⚠️ Промокод {code} отмечен в локальной базе, но не синхронизирован с WooCommerce: {woo_result.get('error')}")
+            return woo_result
+        except Exception as e:
+            logger.error(f"Ошибка при синхронизации промокода {code} с WooCommerce: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    async def close(self):
+        """Дождаться завершения фоновых синхронизаций с WooCommerce"""
+        if self._sync_tasks:
+            await asyncio.gather(*self._sync_tasks.values(), return_exceptions=True)
     
     async def get_promo_stats(self) -> Dict[str, Any]:
         """Получить статистику по промокодам"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            # Общее количество промокодов
-            async with db.execute("SELECT COUNT(*) FROM promocodes") as cursor:
-                total = (await cursor.fetchone())[0]
-            
-            # Использованные промокоды
-            async with db.execute("SELECT COUNT(*) FROM promocodes WHERE is_used = 1") as cursor:
-                used = (await cursor.fetchone())[0]
-            
-            # Статистика синхронизации с WooCommerce
-            async with db.execute("SELECT COUNT(*) FROM promocodes WHERE woocommerce_synced = 1") as cursor:
-                synced = (await cursor.fetchone())[0]
-                
-            async with db.execute("SELECT COUNT(*) FROM promocodes WHERE woocommerce_synced = 0 AND sync_error IS NOT NULL") as cursor:
-                sync_errors = (await cursor.fetchone())[0]
-            
-            return {
-                "total_generated": total,
-                "total_used": used,
-                "usage_rate": round((used / total * 100) if total > 0 else 0, 2),
-                "woocommerce_synced": synced,
-                "sync_errors": sync_errors,
-                "sync_rate": round((synced / total * 100) if total > 0 else 0, 2)
-            }
+        # Все счетчики одним проходом по таблице
+        total, used, synced, sync_errors = await self.db.fetchone("""
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(is_used = 1), 0),
+                COALESCE(SUM(woocommerce_synced = 1), 0),
+                COALESCE(SUM(woocommerce_synced = 0 AND sync_error IS NOT NULL), 0)
+            FROM promocodes
+        """)
+        
+        return {
+            "total_generated": total,
+            "total_used": used,
+            "usage_rate": round((used / total * 100) if total > 0 else 0, 2),
+            "woocommerce_synced": synced,
+            "sync_errors": sync_errors,
+            "sync_rate": round((synced / total * 100) if total > 0 else 0, 2)
+        }
     
-    async def get_unsynced_promocodes(self) -> List[Dict[str, Any]]:
-        """Получить промокоды, не синхронизированные с WooCommerce"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            async with db.execute("""
-                SELECT * FROM promocodes 
-                WHERE woocommerce_synced = 0
-                ORDER BY created_date DESC
-            """) as cursor:
+    async def get_unsynced_promocodes(self, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Получить промокоды, не синхронизированные с WooCommerce
+        
+        Args:
+            limit: Максимальное количество (последние созданные); None - все
+        """
+        async with self.db.acquire_read() as db:
+            # LIMIT -1 в SQLite означает отсутствие ограничения
+            async with db.execute(SQL_SELECT_UNSYNCED_PROMOS, (-1 if limit is None else limit,)) as cursor:
                 codes = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, code)) for code in codes]
+                return [dict(row) for row in codes]
+    
+    async def count_unsynced_promocodes(self) -> int:
+        """Получить количество промокодов, не синхронизированных с WooCommerce"""
+        result = await self.db.fetchone("SELECT COUNT(*) FROM promocodes WHERE woocommerce_synced = 0")
+        return result[0] if result else 0
     
     async def retry_woocommerce_sync(self, code: str) -> bool:
         """Повторить синхронизацию промокода с WooCommerce"""
-        async with aiosqlite.connect(self.db.db_path) as db:
+        async with self.db.acquire_read() as db:
             # Получаем информацию о промокоде
             async with db.execute("""
                 SELECT user_id, discount_percent FROM promocodes 
                 WHERE code = ? AND woocommerce_synced = 0
             """, (code,)) as cursor:
                 promo_info = await cursor.fetchone()
-                
-                if not promo_info:
-                    return False
-                
-                user_id, discount_percent = promo_info
-                
-                # Получаем username пользователя
-                async with db.execute("SELECT username FROM users WHERE user_id = ?", (user_id,)) as cursor:
-                    user_result = await cursor.fetchone()
-                    username = user_result[0] if user_result else None
-                
-                # Пытаемся создать купон в WooCommerce
-                woo_result = await self._create_woocommerce_coupon(code, user_id, discount_percent, username)
-                
-                if woo_result["success"]:
-                    await db.execute("""
-                        UPDATE promocodes 
-                        SET woocommerce_id = ?, woocommerce_synced = 1, sync_error = NULL
-                        WHERE code = ?
-                    """, (woo_result["woocommerce_id"], code))
-                    await db.commit()
-                    return True
-                else:
-                    await db.execute("""
-                        UPDATE promocodes 
-                        SET sync_error = ?
-                        WHERE code = ?
-                    """, (woo_result.get("error", "Unknown error"), code))
-                    await db.commit()
-                    return False
+            
+            if not promo_info:
+                return False
+            
+            user_id, discount_percent = promo_info
+            
+            # Получаем username пользователя
+            async with db.execute("SELECT username FROM users WHERE user_id = ?", (user_id,)) as cursor:
+                user_result = await cursor.fetchone()
+                username = user_result[0] if user_result else None
+        
+        # Пытаемся создать купон в WooCommerce (без удержания соединений)
+        woo_result = await self._create_woocommerce_coupon(code, user_id, discount_percent, username)
+        
+        async with self.db.acquire_write() as db:
+            if woo_result["success"]:
+                await db.execute("""
+                    UPDATE promocodes 
+                    SET woocommerce_id = ?, woocommerce_synced = 1, sync_error = NULL
+                    WHERE code = ?
+                """, (woo_result["woocommerce_id"], code))
+                await db.commit()
+                return True
+            else:
+                await db.execute("""
+                    UPDATE promocodes 
+                    SET sync_error = ?
+                    WHERE code = ?
+                """, (woo_result.get("error", "Unknown error"), code))
+                await db.commit()
+                return False
 
 
 class Analytics:
@@ -447,25 +889,101 @@ class Analytics:
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        # Очередь действий пользователей, записываемых фоновой задачей пакетами
+        self._session_queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        # Строки, уже взятые фоновой задачей из очереди, но еще не записанные
+        self._batch: List[tuple] = []
+        # Запись пакета и flush() не пересекаются: flush() дожидается текущей записи
+        self._write_lock = asyncio.Lock()
     
     async def track_user_action(self, user_id: int, action_type: str, 
                                referral_source: str = None, utm_data: Dict[str, str] = None):
-        """Отследить действие пользователя"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            await db.execute("""
-                INSERT INTO user_sessions (user_id, action_type, referral_source, utm_source, utm_medium, utm_campaign)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, action_type, referral_source,
-                utm_data.get('utm_source') if utm_data else None,
-                utm_data.get('utm_medium') if utm_data else None,
-                utm_data.get('utm_campaign') if utm_data else None
-            ))
-            await db.commit()
+        """Отследить действие пользователя (запись в БД выполняется пакетно в фоне)"""
+        if self._flusher_task is None or self._flusher_task.done():
+            if self._session_queue is None:
+                self._session_queue = asyncio.Queue()
+            self._flusher_task = asyncio.create_task(self._flush_loop())
+        
+        self._session_queue.put_nowait((
+            user_id, action_type, referral_source,
+            utm_data.get('utm_source') if utm_data else None,
+            utm_data.get('utm_medium') if utm_data else None,
+            utm_data.get('utm_campaign') if utm_data else None
+        ))
+    
+    async def _flush_loop(self):
+        """Фоновая запись действий: пакет до BULK_RECORDER_SIZE строк или FLUSH_TIMEOUT_MS"""
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._session_queue.get()
+            if row is None:
+                return
+            
+            self._batch.append(row)
+            stop = False
+            deadline = loop.time() + FLUSH_TIMEOUT_MS / 1000
+            while len(self._batch) < BULK_RECORDER_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._session_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                self._batch.append(row)
+            
+            async with self._write_lock:
+                # Пакет мог быть уже записан через flush()
+                rows, self._batch = self._batch, []
+                if rows:
+                    await self._write_sessions(rows)
+            if stop:
+                return
+    
+    async def _write_sessions(self, rows: List[tuple]):
+        """Записать накопленные действия пакетами (по транзакции на пакет)"""
+        try:
+            for start in range(0, len(rows), BULK_RECORDER_MAX_ROWS_PER_INSERT):
+                await self.db.executemany(SQL_INSERT_SESSION, rows[start:start + BULK_RECORDER_MAX_ROWS_PER_INSERT])
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи действий пользователей ({len(rows)} шт.): {e}")
+    
+    async def flush(self):
+        """Немедленно записать действия, накопленные в очереди и в текущем пакете"""
+        if self._session_queue is None:
+            return
+        
+        async with self._write_lock:
+            while not self._session_queue.empty():
+                row = self._session_queue.get_nowait()
+                if row is None:
+                    # Сигнал остановки оставляем фоновой задаче
+                    self._session_queue.put_nowait(None)
+                    break
+                self._batch.append(row)
+            
+            rows, self._batch = self._batch, []
+            if rows:
+                await self._write_sessions(rows)
+    
+    async def close(self):
+        """Остановить фоновую запись, дописав накопленные действия"""
+        if self._flusher_task is not None and not self._flusher_task.done():
+            self._session_queue.put_nowait(None)
+            await self._flusher_task
+        self._flusher_task = None
+        await self.flush()
     
     async def get_traffic_stats(self, days: int = 30) -> Dict[str, Any]:
         """Получить статистику трафика за последние дни"""
-        async with aiosqlite.connect(self.db.db_path) as db:
+        await self.flush()
+        # Модификатор даты передается параметром, текст запроса не зависит от days
+        since = f"-{int(days)} days"
+        async with self.db.acquire_read() as db:
             # Общая статистика переходов
             async with db.execute("""
                 SELECT 
@@ -474,9 +992,9 @@ class Analytics:
                     referral_source,
                     COUNT(*) as sessions_count
                 FROM user_sessions 
-                WHERE session_date >= datetime('now', '-{} days')
+                WHERE session_date >= datetime('now', ?)
                 GROUP BY referral_source
-            """.format(days)) as cursor:
+            """, (since,)) as cursor:
                 traffic_by_source = await cursor.fetchall()
             
             # Статистика по дням
@@ -486,10 +1004,10 @@ class Analytics:
                     COUNT(DISTINCT user_id) as unique_users,
                     COUNT(*) as sessions
                 FROM user_sessions 
-                WHERE session_date >= datetime('now', '-{} days')
+                WHERE session_date >= datetime('now', ?)
                 GROUP BY DATE(session_date)
                 ORDER BY date DESC
-            """.format(days)) as cursor:
+            """, (since,)) as cursor:
                 daily_stats = await cursor.fetchall()
             
             return {
@@ -505,32 +1023,21 @@ class Analytics:
     
     async def get_conversion_stats(self) -> Dict[str, float]:
         """Получить статистику конверсии"""
-        async with aiosqlite.connect(self.db.db_path) as db:
-            # Пользователи, которые начали работу с ботом
-            async with db.execute("""
-                SELECT COUNT(DISTINCT user_id) FROM user_sessions 
-                WHERE action_type = 'start'
-            """) as cursor:
-                started_users = (await cursor.fetchone())[0]
-            
-            # Пользователи, которые получили промокод
-            async with db.execute("""
-                SELECT COUNT(DISTINCT user_id) FROM promocodes
-            """) as cursor:
-                promo_users = (await cursor.fetchone())[0]
-            
-            # Пользователи, которые использовали промокод
-            async with db.execute("""
-                SELECT COUNT(DISTINCT user_id) FROM promocodes 
-                WHERE is_used = 1
-            """) as cursor:
-                converted_users = (await cursor.fetchone())[0]
-            
-            return {
-                "start_to_promo": round((promo_users / started_users * 100) if started_users > 0 else 0, 2),
-                "promo_to_purchase": round((converted_users / promo_users * 100) if promo_users > 0 else 0, 2),
-                "overall_conversion": round((converted_users / started_users * 100) if started_users > 0 else 0, 2)
-            }
+        await self.flush()
+        # Пользователи, которые начали работу с ботом, получили и использовали промокод
+        started_users, promo_users, converted_users = await self.db.fetchone("""
+            SELECT
+                (SELECT COUNT(DISTINCT user_id) FROM user_sessions WHERE action_type = 'start'),
+                COUNT(DISTINCT user_id),
+                COUNT(DISTINCT CASE WHEN is_used = 1 THEN user_id END)
+            FROM promocodes
+        """)
+        
+        return {
+            "start_to_promo": round((promo_users / started_users * 100) if started_users > 0 else 0, 2),
+            "promo_to_purchase": round((converted_users / promo_users * 100) if promo_users > 0 else 0, 2),
+            "overall_conversion": round((converted_users / started_users * 100) if started_users > 0 else 0, 2)
+        }
 
 
 class Settings:
@@ -538,37 +1045,80 @@ class Settings:
     
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
+        # Кэш значений: ключ -> (значение или None, время чтения)
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
     
     async def get_setting(self, key: str, default_value: str = None) -> str:
-        """Получить значение настройки"""
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
-            async with db.execute("""
-                SELECT value FROM bot_settings WHERE key = ?
-            """, (key,)) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else default_value
+        """Получить значение настройки (с кэшем на SETTINGS_CACHE_TTL секунд)"""
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[1] < SETTINGS_CACHE_TTL:
+            value = cached[0]
+        else:
+            result = await self.db_manager.fetchone(SQL_GET_SETTING, (key,))
+            value = result[0] if result else None
+            self._cache[key] = (value, time.monotonic())
+        return value if value is not None else default_value
+    
+    async def prime(self):
+        """Загрузить все настройки в кэш одним запросом (при старте бота)"""
+        rows = await self.db_manager.fetchall("SELECT key, value FROM bot_settings")
+        now = time.monotonic()
+        self._cache = {key: (value, now) for key, value in rows}
+        logger.info(f"✅ Настройки загружены в кэш: {len(self._cache)}")
+    
+    def invalidate(self, key: str = None):
+        """Сбросить кэш настройки (или всех настроек, если ключ не указан)"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
     
     async def set_setting(self, key: str, value: str) -> bool:
         """Сохранить настройку"""
         try:
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
-                await db.execute("""
-                    INSERT OR REPLACE INTO bot_settings (key, value, updated_date)
-                    VALUES (?, ?, ?)
-                """, (key, value, datetime.now().isoformat()))
-                await db.commit()
-                return True
+            await self.db_manager.execute(SQL_UPSERT_SETTING, (key, value))
+            self._cache[key] = (value, time.monotonic())
+            return True
         except Exception as e:
             logger.error(f"Ошибка сохранения настройки {key}: {e}")
             return False
     
+    async def get_promo_defaults(self) -> Dict[str, int]:
+        """Получить настройки промокодов (скидка и срок действия) одной записью"""
+        return decode_promo_defaults(await self.get_setting(PROMO_DEFAULTS_KEY))
+    
+    async def set_promo_defaults(self, **values: int) -> bool:
+        """
+        Обновить поля настроек промокодов одной записью
+        
+        Args:
+            values: Обновляемые поля (discount, duration_days)
+        """
+        try:
+            # Чтение и запись под блокировкой писателя, чтобы не потерять параллельное изменение
+            async with self.db_manager.acquire_write() as db:
+                async with db.execute(SQL_GET_SETTING, (PROMO_DEFAULTS_KEY,)) as cursor:
+                    row = await cursor.fetchone()
+                
+                promo_defaults = decode_promo_defaults(row[0] if row else None)
+                promo_defaults.update(values)
+                
+                value = encode_promo_defaults(promo_defaults)
+                await db.execute(SQL_UPSERT_SETTING, (PROMO_DEFAULTS_KEY, value))
+                await db.commit()
+            self._cache[PROMO_DEFAULTS_KEY] = (value, time.monotonic())
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения настроек промокодов {values}: {e}")
+            return False
+    
     async def get_promo_discount_percent(self) -> int:
         """Получить процент скидки для промокодов"""
-        value = await self.get_setting('promo_discount_percent')
-        if value:
+        value = (await self.get_promo_defaults()).get('discount')
+        if value is not None:
             try:
                 return int(value)
-            except ValueError:
+            except (TypeError, ValueError):
                 logger.error(f"Некорректное значение процента скидки: {value}")
         
         # Если настройка не найдена, возвращаем значение по умолчанию
@@ -580,18 +1130,18 @@ class Settings:
     
     async def set_promo_discount_percent(self, percent: int) -> bool:
         """Установить процент скидки для промокодов"""
-        return await self.set_setting('promo_discount_percent', str(percent))
+        return await self.set_promo_defaults(discount=int(percent))
     
     async def get_promo_duration_days(self) -> int:
         """Получить срок действия промокодов в днях"""
-        value = await self.get_setting('promo_duration_days')
-        if value:
+        value = (await self.get_promo_defaults()).get('duration_days')
+        if value is not None:
             try:
                 return int(value)
-            except ValueError:
+            except (TypeError, ValueError):
                 logger.error(f"Некорректное значение срока действия: {value}")
         return 7  # По умолчанию 7 дней
     
     async def set_promo_duration_days(self, days: int) -> bool:
         """Установить срок действия промокодов в днях"""  
-        return await self.set_setting('promo_duration_days', str(days))
+        return await self.set_promo_defaults(duration_days=int(days))
@@ -7,23 +7,490 @@ from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from datetime import datetime, timedelta
 import asyncio
+import functools
+import html
 import io
+import logging
+from collections import Counter, OrderedDict
+from itertools import islice
 
-from database.database import db
+from database.database import get_db
 from utils.config import Config
 from utils.analytics import AnalyticsHelper
-# Динамический импорт систем мониторинга и уведомлений
-# (инициализируются в main.py)
+from utils.ratelimit import AsyncTokenBucket
+from utils.cache import AsyncTTLCache
 from utils.uptimerobot import uptime_manager
+# Экземпляры систем мониторинга и уведомлений создаются в main.py после запуска,
+# поэтому берем их из модулей в момент вызова
+import utils.monitoring as monitoring_module
+import utils.notifications as notifications_module
+
+db = get_db()
+logger = logging.getLogger(__name__)
+
+# Режимы разметки сообщений
+_HTML = ParseMode.HTML
+_MD = ParseMode.MARKDOWN
+
+# Локальная ссылка на множество администраторов для проверки на каждом вызове
+_ADMIN_IDS = frozenset(Config.ADMIN_IDS)
+
+# Рассылка: одновременных отправок и сообщений в секунду (лимит Telegram ~30 сообщений/сек).
+# Пул соединений к Bot API (main.BOT_CONNECTION_POOL_SIZE) должен быть заметно больше BROADCAST_CONCURRENCY
+BROADCAST_CONCURRENCY = 30
+BROADCAST_RATE_PER_SEC = 30
+
+# Сколько секунд ждать синхронизации с WooCommerce при ручной отметке промокода
+WOO_SYNC_WAIT_TIMEOUT = 3.0
+
+# Сколько секунд клиент Telegram может показывать статичный ответ на кнопку уведомлений без запроса к боту
+NOTIFICATIONS_ALERT_CACHE_TIME = 30
+
+# Кэш статуса UptimeRobot в панели мониторинга (секунды): повторные нажатия «Обновить» не ходят в API.
+# «Тест подключения» всегда выполняется заново
+MONITORING_STATUS_TTL = 10.0
+# Сколько секунд панель ждет ответа UptimeRobot; дольше — показывается последний полученный статус
+MONITORING_STATUS_TIMEOUT = 3.0
+# Если действие мониторинга завершилось быстрее, сообщение «Подождите...» не отправляется
+MONITORING_PLACEHOLDER_DELAY = 0.3
+_monitoring_status_cache = AsyncTTLCache(MONITORING_STATUS_TTL)
+# Запросы статуса, продолжающиеся в фоне после таймаута (ссылки держим до завершения)
+_background_status_tasks = set()
+
+# Последний отрисованный вариант панелей по (chat_id, message_id): повторное «Обновить» без изменений
+# не отправляет edit_message_text (Telegram ответил бы «message is not modified»)
+PANEL_RENDER_CACHE_SIZE = 256
+_last_panel_render = OrderedDict()
+
+# Статические тексты админ-панели; переменные части подставляются через str.format
+ADMIN_STATS_TEMPLATE = """<b>Статистика PlummyPromo бота</b>
+
+<b>Общая информация:</b>
+• Всего пользователей: {total_users}
+• Активных пользователей (7 дней): {active_users_7d}
+• Активных пользователей (30 дней): {active_users_30d}
+
+<b>Промокоды:</b>
+• Всего выдано: {total_generated}
+• Использовано: {total_used}
+• Коэффициент использования: {usage_rate}%
+
+<b>Конверсии:</b>
+• Старт → Промокод: {start_to_promo}%
+• Промокод → Покупка: {promo_to_purchase}%
+• Общая конверсия: {overall_conversion}%"""
+
+ADMIN_HELP_TEXT = """
+🔧 **Админ-панель PlummyPromo**
+
+📊 **Команды статистики:**
+/stats - Общая статистика бота
+/admin_help - Эта справка
+
+📢 **Рассылки:**
+• Через кнопку в /stats
+• Поддерживается Markdown разметка
+• Автоматическая проверка активных пользователей
+
+🎁 **Управление промокодами:**
+• Просмотр всех выданных промокодов
+• Отметка использованных промокодов
+• Статистика конверсии
+
+⚙️ **Настройки:**
+• Изменение скидки в .env файле
+• Включение/отключение рассылок
+• Настройка аналитики
+
+📊 **Аналитика включает:**
+• Источники трафика (UTM метки)
+• Конверсию по воронке
+• Статистику по дням
+• Эффективность промокодов
+
+❓ Вопросы по настройке? Проверьте README.md
+"""
+
+BROADCAST_SETUP_TEMPLATE = """
+📢 **Настройка рассылки**
+
+👥 Всего пользователей: {users_count}  
+✅ Активных пользователей: {active_count}
+🔕 Отключили уведомления: {disabled_count}
+
+📝 **Для создания рассылки:**
+Отправьте сообщение с текстом рассылки, и я разошлю его всем активным пользователям.
+
+⚠️ **Правила рассылки:**
+• Не более 1 рассылки в день
+• Только полезная информация
+• Соблюдение законов о персональных данных
+
+Готовы создать рассылку? Отправьте текст сообщения.
+"""
+
+BROADCAST_CONFIRM_TEMPLATE = """
+📢 **Подтверждение рассылки**
+
+📝 **Текст сообщения:**
+{message_text}
+
+👥 **Получателей:** {recipients} пользователей
+
+⚠️ Это действие нельзя отменить. Продолжить?
+"""
+
+# Ввод числовых настроек администратором:
+# флаг ожидания -> (минимум, максимум, метод Settings, текст об успехе, параметр admin_promo_settings)
+ADMIN_INPUT_STATES = {
+    'waiting_for_discount': (
+        1, 99, 'set_promo_discount_percent',
+        "**Размер скидки обновлен**: {}%\n\n"
+        "Изменения вступят в силу для новых промокодов немедленно.\n"
+        "Старые промокоды остаются с прежней скидкой.",
+        'discount'
+    ),
+    'waiting_for_duration': (
+        1, 365, 'set_promo_duration_days',
+        "**Срок действия обновлен**: {} дней\n\n"
+        "Изменения вступят в силу для новых промокодов немедленно.\n"
+        "Старые промокоды сохраняют свой прежний срок действия.",
+        'duration'
+    ),
+}
+
+PROMO_MARK_USED_PROMPT = """
+**Отметить промокод использованным**
+
+Введите код промокода который нужно отметить как использованный:
+
+Пример: PLUMMYABC123
+"""
+
+NOTIFICATIONS_PANEL_TEMPLATE = """<b>Система уведомлений о промокодах</b>
+
+<b>Статус:</b> {status_text}
+<b>Режим:</b> Автоматический (всегда включен)
+
+<b>Статистика:</b>
+• Активных промокодов: {total_active_promos}
+• Уведомлений за 5 дней: {notifications_5_days}  
+• Уведомлений за 3 дня: {notifications_3_days}
+• Уведомлений за 1 день: {notifications_1_day}
+
+<b>Тексты уведомлений (БЕЗ изображений):</b>
+
+<b>За 5 дней:</b>
+<i>Ваш промокод истечет через 5 дней
+Успейте заказать без комиссии!
+<a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">Plummy.ru</a></i>
+
+<b>За 3 дня:</b>
+<i>По промокоду мы гарантируем САМЫЕ НИЗКИЕ цены на оригинальные вещи.</i>
+
+<b>За 1 день:</b>
+<i>Ваш промокод истечет через 24 часа
+Не упустите свой шанс!
+<a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">Plummy.ru</a></i>
+
+ℹ️ <b>Уведомления отправляются автоматически всем пользователям с активными промокодами, кроме заблокированных или использовавших промокоды.</b>"""
+
+
+MONITORING_NOT_INITIALIZED_TEXT = """❌ <b>Система мониторинга не инициализирована</b>
+
+Мониторинг будет доступен после перезапуска бота."""
+
+MONITORING_UNAVAILABLE_TEMPLATE = """❌ <b>Мониторинг сайта недоступен</b>
+
+Ошибка: {error}
+
+Проверьте настройки UptimeRobot в конфигурации."""
+
+MONITORING_TIMEOUT_TEXT = """⏳ <b>UptimeRobot не ответил вовремя</b>
+
+Запрос продолжается в фоне, нажмите «Обновить» через несколько секунд."""
+
+MONITORING_STALE_NOTICE = "⚠️ <i>Данные могут быть устаревшими</i>\n\n"
+
+MONITORING_START_WAIT_TEXT = "🚀 <b>Запуск мониторинга...</b>\n\nПожалуйста, подождите..."
+MONITORING_STOP_WAIT_TEXT = "🛑 <b>Остановка мониторинга...</b>\n\nПожалуйста, подождите..."
+MONITORING_TEST_WAIT_TEXT = "🧪 <b>Тестирование подключения...</b>\n\nПроверяем связь с UptimeRobot API..."
+
+MONITORING_START_OK_TEXT = """✅ <b>Мониторинг запущен успешно!</b>
+
+Система начала отслеживать состояние сайта.
+Вы будете получать уведомления при изменении статуса."""
+
+MONITORING_START_FAIL_TEXT = """❌ <b>Ошибка запуска мониторинга</b>
+
+Не удалось запустить систему мониторинга.
+Проверьте настройки UptimeRobot API."""
+
+MONITORING_STOP_OK_TEXT = """✅ <b>Мониторинг остановлен</b>
+
+Система больше не отслеживает состояние сайта.
+Уведомления отправляться не будут."""
+
+MONITORING_STOP_FAIL_TEXT = """❌ <b>Ошибка остановки мониторинга</b>
+
+Возможно, мониторинг уже был остановлен."""
+
+MONITORING_TEST_OK_TEMPLATE = """✅ <b>Подключение успешно!</b>
+
+<b>Статус API:</b> Работает
+<b>Найдено мониторов:</b> {monitors_count}
+
+{message}"""
+
+MONITORING_TEST_FAIL_TEMPLATE = """❌ <b>Ошибка подключения</b>
+
+<b>Проблема:</b> {error}
+
+Проверьте:
+• API ключ в настройках
+• Подключение к интернету
+• Настройки UptimeRobot"""
+
+
+# Ограничение длины текста исключения в ответах администратору
+# (всплывающий ответ на callback Telegram принимает не длиннее 200 символов)
+ADMIN_ERROR_TEXT_LIMIT = 300
+CALLBACK_ALERT_ERROR_LIMIT = 180
+
+
+def _format_error(error: Exception, limit: int = ADMIN_ERROR_TEXT_LIMIT) -> str:
+    """Текст исключения для ответа администратору, обрезанный до limit символов"""
+    text = str(error)
+    if len(text) > limit:
+        return text[:limit - 1] + "…"
+    return text
+
+
+def _finish_background_status_task(task: asyncio.Task):
+    """Освободить фоновый запрос статуса и залогировать его ошибку"""
+    _background_status_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Фоновое обновление статуса мониторинга не удалось: {_format_error(task.exception())}")
+
+
+def _format_check_time(value: str) -> str:
+    """Время проверки из ISO-строки без долей секунды"""
+    return value[:19]
+
+
+# Сколько мониторов показывать в кратком списке на панели мониторинга
+MONITORING_PREVIEW_COUNT = 3
+
+# Сколько мониторов показывать на одной странице подробной информации
+MONITORING_DETAILS_PAGE_SIZE = 10
+
+# Значки доступности монитора и подписи состояния мониторинга
+_UP_ICON = {True: "🟢", False: "🔴"}
+_MONITORING_STATE_TEXT = {True: "🟢 Активен", False: "🛑 Остановлен"}
+
+
+@functools.lru_cache(maxsize=32)
+def _render_monitors_preview(monitors: tuple, total: int) -> str:
+    """
+    Краткий список мониторов для панели мониторинга
+    
+    Args:
+        monitors: Кортеж (friendly_name, is_up) первых мониторов
+        total: Общее количество мониторов
+    """
+    parts = ["\n<b>Мониторы:</b>\n"]
+    for friendly_name, is_up in monitors:
+        parts.append(f"{_UP_ICON[is_up]} {html.escape(friendly_name)}\n")
+    
+    if total > len(monitors):
+        parts.append(f"... и еще {total - len(monitors)}\n")
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=32)
+def _render_monitors_details(monitors: tuple) -> str:
+    """
+    Подробный список мониторов
+    
+    Args:
+        monitors: Кортеж (friendly_name, url, status_description, is_up, uptime_ratio) по каждому монитору
+    """
+    parts = ["<b>Мониторы:</b>\n"]
+    for friendly_name, url, status_description, is_up, uptime in monitors:
+        parts.append(
+            f"{_UP_ICON[is_up]} <b>{html.escape(friendly_name)}</b>\n"
+            f"   URL: <code>{html.escape(url)}</code>\n"
+            f"   Статус: {html.escape(status_description)}\n"
+            f"   Uptime: {uptime}%\n\n"
+        )
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=32)
+def _monitoring_details_keyboard(page: int, pages: int) -> InlineKeyboardMarkup:
+    """Клавиатура страницы подробной информации: переход между страницами, обновление и возврат"""
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("‹ Предыдущие", callback_data=f"admin_monitoring_details:{page - 1}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton("Следующие ›", callback_data=f"admin_monitoring_details:{page + 1}"))
+    
+    return InlineKeyboardMarkup([
+        navigation,
+        [InlineKeyboardButton("🔄 Обновить", callback_data=f"admin_monitoring_details:{page}")],
+        [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
+    ])
 
 
 class AdminHandlers:
     """Обработчики для администратора"""
     
+    # Статические клавиатуры меню (создаются один раз при загрузке модуля)
+    _MAIN_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Рассылка", callback_data="admin_broadcast")],
+        [InlineKeyboardButton("Управление промокодами", callback_data="admin_promo_manage")],
+        [InlineKeyboardButton("Уведомления", callback_data="admin_notifications")],
+        [InlineKeyboardButton("Мониторинг сайта", callback_data="admin_monitoring")]
+    ])
+    _BACK_TO_MAIN_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Назад", callback_data="admin_back_to_main")]
+    ])
+    _PROMO_MANAGE_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Задать параметры скидки", callback_data="admin_promo_settings")],
+        [InlineKeyboardButton("Отметить использованным", callback_data="admin_promo_mark_used")],
+        [InlineKeyboardButton("Назад", callback_data="admin_back_to_main")]
+    ])
+    _PROMO_SETTINGS_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("📈 Изменить процент скидки", callback_data="admin_set_discount")],
+        [InlineKeyboardButton("📅 Изменить срок действия", callback_data="admin_set_duration")],
+        [InlineKeyboardButton("← Назад", callback_data="admin_promo_manage")]
+    ])
+    _CANCEL_TO_SETTINGS_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Отменить", callback_data="admin_promo_settings")]
+    ])
+    _CANCEL_TO_PROMO_MANAGE_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Отменить", callback_data="admin_promo_manage")]
+    ])
+    _UNSYNCED_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Обновить", callback_data="admin_list_unsynced")],
+        [InlineKeyboardButton("← Назад", callback_data="admin_woocommerce")]
+    ])
+    _NOTIFICATIONS_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🧪 Тест (5 дн.)", callback_data="admin_notifications_test_5"),
+         InlineKeyboardButton("🧪 Тест (3 дн.)", callback_data="admin_notifications_test_3"),
+         InlineKeyboardButton("🧪 Тест (1 дн.)", callback_data="admin_notifications_test_1")],
+        [InlineKeyboardButton("🔄 Обновить", callback_data="admin_notifications")],
+        [InlineKeyboardButton("⬅ Назад", callback_data="admin_stats")]
+    ])
+    _MONITORING_ACTIVE_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🛑 Остановить мониторинг", callback_data="admin_monitoring_stop")],
+        [InlineKeyboardButton("📊 Подробная информация", callback_data="admin_monitoring_details")],
+        [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring")],
+        [InlineKeyboardButton("← Назад", callback_data="admin_back_to_main")]
+    ])
+    _MONITORING_STOPPED_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🚀 Запустить мониторинг", callback_data="admin_monitoring_start")],
+        [InlineKeyboardButton("🧪 Тест подключения", callback_data="admin_monitoring_test")],
+        [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring")],
+        [InlineKeyboardButton("← Назад", callback_data="admin_back_to_main")]
+    ])
+    # Клавиатура панели мониторинга по флагу is_monitoring
+    _MONITORING_KEYBOARDS = {True: _MONITORING_ACTIVE_KEYBOARD, False: _MONITORING_STOPPED_KEYBOARD}
+    _MONITORING_RETRY_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring")],
+        [InlineKeyboardButton("← Назад", callback_data="admin_back_to_main")]
+    ])
+    _BACK_TO_MONITORING_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
+    ])
+    _MONITORING_DETAILS_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring_details")],
+        [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
+    ])
+    
     @staticmethod
     def is_admin(user_id: int) -> bool:
         """Проверить, является ли пользователь администратором"""
-        return user_id in Config.ADMIN_IDS
+        return user_id in _ADMIN_IDS
+    
+    @staticmethod
+    async def _reply(update: Update, text: str, **kwargs):
+        """Отредактировать сообщение с кнопками (callback) или ответить новым сообщением (команда)"""
+        if update.callback_query:
+            return await update.callback_query.edit_message_text(text, **kwargs)
+        return await update.message.reply_text(text, **kwargs)
+    
+    @staticmethod
+    def _panel_key(update: Update):
+        """Ключ сообщения с панелью, к которому относится callback"""
+        message = update.callback_query.message
+        if message is None:
+            return None
+        return message.chat_id, message.message_id
+    
+    @staticmethod
+    async def _edit_panel(update: Update, text: str, reply_markup: InlineKeyboardMarkup = None, **kwargs):
+        """Отредактировать панель, пропуская запрос к Telegram, если текст и кнопки не изменились"""
+        key = AdminHandlers._panel_key(update)
+        buttons = () if reply_markup is None else tuple(
+            (button.text, button.callback_data) for row in reply_markup.inline_keyboard for button in row
+        )
+        digest = hash((text, buttons, kwargs.get('parse_mode')))
+        
+        if key is not None and _last_panel_render.get(key) == digest:
+            _last_panel_render.move_to_end(key)
+            return
+        
+        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, **kwargs)
+        
+        if key is not None:
+            _last_panel_render[key] = digest
+            _last_panel_render.move_to_end(key)
+            if len(_last_panel_render) > PANEL_RENDER_CACHE_SIZE:
+                _last_panel_render.popitem(last=False)
+    
+    @staticmethod
+    async def _get_monitoring_status(site_monitoring):
+        """
+        Получить статус мониторинга, не дожидаясь медленного UptimeRobot дольше MONITORING_STATUS_TIMEOUT
+        
+        Returns:
+            Кортеж (status, is_stale); при таймауте возвращается последний закэшированный
+            статус (или None, если его еще нет), а запрос продолжает обновлять кэш в фоне
+        """
+        task = asyncio.ensure_future(_monitoring_status_cache.get(site_monitoring.get_monitoring_status))
+        try:
+            status = await asyncio.wait_for(asyncio.shield(task), MONITORING_STATUS_TIMEOUT)
+            return status, False
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ UptimeRobot не ответил за {MONITORING_STATUS_TIMEOUT} сек, используется последний статус")
+            # Запрос продолжается без ожидающего: держим ссылку и логируем его ошибку сами
+            _background_status_tasks.add(task)
+            task.add_done_callback(_finish_background_status_task)
+            return _monitoring_status_cache.data, True
+    
+    @staticmethod
+    async def _await_with_placeholder(update: Update, coro, placeholder: str):
+        """Дождаться coro, показав placeholder только если ответ задерживается"""
+        task = asyncio.create_task(coro)
+        try:
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), MONITORING_PLACEHOLDER_DELAY)
+            except asyncio.TimeoutError:
+                pass
+            
+            # Ошибка показа placeholder не должна терять результат самого действия
+            try:
+                await update.callback_query.edit_message_text(
+                    placeholder, parse_mode=_HTML, disable_web_page_preview=True
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось показать сообщение ожидания: {_format_error(e)}")
+            return await task
+        finally:
+            # Если ожидание прервано (например, отменой обработчика), действие не остается без владельца
+            if not task.done():
+                task.cancel()
     
     @staticmethod
     async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -31,86 +498,60 @@ class AdminHandlers:
         if not AdminHandlers.is_admin(update.effective_user.id):
             # Универсальная отправка сообщения об ошибке
             error_text = "У вас нет доступа к этой команде"
-            if update.callback_query:
-                await update.callback_query.edit_message_text(error_text)
-            else:
-                await update.message.reply_text(error_text)
+            await AdminHandlers._reply(update, error_text)
             return
         
         try:
-            # Получаем полную статистику
-            stats_7d = await db.analytics.get_traffic_stats(days=7)
-            stats_30d = await db.analytics.get_traffic_stats(days=30)
-            promo_stats = await db.promo.get_promo_stats()
-            conversion_stats = await db.analytics.get_conversion_stats()
-            total_users = await db.user.get_users_count()
+            # Получаем полную статистику (независимые запросы выполняются параллельно)
+            stats_7d, stats_30d, promo_stats, conversion_stats, total_users = await asyncio.gather(
+                db.analytics.get_traffic_stats(days=7),
+                db.analytics.get_traffic_stats(days=30),
+                db.promo.get_promo_stats(),
+                db.analytics.get_conversion_stats(),
+                db.user.get_users_count()
+            )
             
             # Формируем полное сообщение статистики с HTML форматированием
-            message = f"""<b>Статистика PlummyPromo бота</b>
-
-<b>Общая информация:</b>
-• Всего пользователей: {total_users}
-• Активных пользователей (7 дней): {stats_7d.get('unique_users', 0)}
-• Активных пользователей (30 дней): {stats_30d.get('unique_users', 0)}
-
-<b>Промокоды:</b>
-• Всего выдано: {promo_stats.get('total_generated', 0)}
-• Использовано: {promo_stats.get('total_used', 0)}
-• Коэффициент использования: {promo_stats.get('usage_rate', 0)}%
-
-<b>Конверсии:</b>
-• Старт → Промокод: {conversion_stats.get('start_to_promo', 0)}%
-• Промокод → Покупка: {conversion_stats.get('promo_to_purchase', 0)}%
-• Общая конверсия: {conversion_stats.get('overall_conversion', 0)}%"""
+            parts = [ADMIN_STATS_TEMPLATE.format(
+                total_users=total_users,
+                active_users_7d=stats_7d.get('unique_users', 0),
+                active_users_30d=stats_30d.get('unique_users', 0),
+                total_generated=promo_stats.get('total_generated', 0),
+                total_used=promo_stats.get('total_used', 0),
+                usage_rate=promo_stats.get('usage_rate', 0),
+                start_to_promo=conversion_stats.get('start_to_promo', 0),
+                promo_to_purchase=conversion_stats.get('promo_to_purchase', 0),
+                overall_conversion=conversion_stats.get('overall_conversion', 0)
+            )]
 
             # Добавляем статистику по дням за последние 7 дней
             if stats_7d.get('daily_stats'):
-                message += "\n\n<b>Активность по дням (последние 5 дней):</b>\n"
-                for day_stat in stats_7d['daily_stats'][:5]:
-                    date_str = str(day_stat['date'])
-                    users_str = str(day_stat['unique_users'])
-                    sessions_str = str(day_stat['sessions'])
-                    message += f"• {date_str}: {users_str} польз. ({sessions_str} сессий)\n"
+                parts.append("\n\n<b>Активность по дням (последние 5 дней):</b>\n")
+                parts.extend(
+                    f"• {day_stat['date']}: {day_stat['unique_users']} польз. ({day_stat['sessions']} сессий)\n"
+                    for day_stat in stats_7d['daily_stats'][:5]
+                )
             
             # Добавляем источники трафика
             if stats_7d.get('traffic_by_source'):
-                message += "\n<b>Источники трафика (7 дней):</b>\n"
-                for source in stats_7d['traffic_by_source']:
-                    source_name = str(source['source'])
-                    users_count = str(source['users'])
-                    message += f"• {source_name}: {users_count} польз.\n"
+                parts.append("\n<b>Источники трафика (7 дней):</b>\n")
+                parts.extend(
+                    f"• {source['source']}: {source['users']} польз.\n"
+                    for source in stats_7d['traffic_by_source']
+                )
             
-            # Создаем упрощенное меню админ панели
-            keyboard_buttons = [
-                [InlineKeyboardButton("Рассылка", callback_data="admin_broadcast")],
-                [InlineKeyboardButton("Управление промокодами", callback_data="admin_promo_manage")],
-                [InlineKeyboardButton("Уведомления", callback_data="admin_notifications")],
-                [InlineKeyboardButton("Мониторинг сайта", callback_data="admin_monitoring")]
-            ]
+            message = "".join(parts)
             
-            keyboard = InlineKeyboardMarkup(keyboard_buttons)
+            # Упрощенное меню админ панели
+            keyboard = AdminHandlers._MAIN_KEYBOARD
             
             # Универсальная отправка сообщения - либо редактируем, либо отправляем новое
-            if update.callback_query:
-                await update.callback_query.edit_message_text(
-                    message,
-                    reply_markup=keyboard,
-                    parse_mode=ParseMode.HTML
-                )
-            else:
-                await update.message.reply_text(
-                    message,
-                    reply_markup=keyboard,
-                    parse_mode=ParseMode.HTML
-                )
+            await AdminHandlers._reply(update, message, reply_markup=keyboard, parse_mode=_HTML)
             
         except Exception as e:
             error_text = f"Ошибка при получении статистики: {str(e)}"
             # Универсальная отправка сообщения об ошибке
-            if update.callback_query:
-                await update.callback_query.edit_message_text(error_text)
-            else:
-                await update.message.reply_text(error_text)
+            await AdminHandlers._reply(update, error_text)
     
     @staticmethod
     async def admin_broadcast_setup(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -121,34 +562,22 @@ class AdminHandlers:
         if not Config.BROADCAST_ENABLED:
             await update.callback_query.edit_message_text(
                 "❌ Рассылки отключены в конфигурации",
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=_MD
             )
             return
         
         users_count = await db.user.get_users_count()
-        active_users = await db.user.get_all_active_users()
+        active_count = await db.user.get_active_users_count()
         
-        broadcast_text = f"""
-📢 **Настройка рассылки**
-
-👥 Всего пользователей: {users_count}  
-✅ Активных пользователей: {len(active_users)}
-🔕 Отключили уведомления: {users_count - len(active_users)}
-
-📝 **Для создания рассылки:**
-Отправьте сообщение с текстом рассылки, и я разошлю его всем активным пользователям.
-
-⚠️ **Правила рассылки:**
-• Не более 1 рассылки в день
-• Только полезная информация
-• Соблюдение законов о персональных данных
-
-Готовы создать рассылку? Отправьте текст сообщения.
-        """
+        broadcast_text = BROADCAST_SETUP_TEMPLATE.format(
+            users_count=users_count,
+            active_count=active_count,
+            disabled_count=users_count - active_count
+        )
         
         await update.callback_query.edit_message_text(
             broadcast_text,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_MD
         )
         
         # Устанавливаем состояние ожидания сообщения для рассылки
@@ -165,11 +594,12 @@ class AdminHandlers:
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        promo_stats = await db.promo.get_promo_stats()
-        
-        # Получаем текущие настройки из базы данных
-        current_discount = await db.settings.get_promo_discount_percent()
-        current_duration = await db.settings.get_promo_duration_days()
+        # Получаем статистику и текущие настройки из базы данных параллельно
+        promo_stats, current_discount, current_duration = await asyncio.gather(
+            db.promo.get_promo_stats(),
+            db.settings.get_promo_discount_percent(),
+            db.settings.get_promo_duration_days()
+        )
         
         manage_text = f"""
 **Управление промокодами**
@@ -188,35 +618,27 @@ class AdminHandlers:
 Изменение настроек повлияет только на новые промокоды.
         """
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Задать параметры скидки", callback_data="admin_promo_settings")],
-            [InlineKeyboardButton("Отметить использованным", callback_data="admin_promo_mark_used")],
-            [InlineKeyboardButton("Назад", callback_data="admin_back_to_main")]
-        ])
+        keyboard = AdminHandlers._PROMO_MANAGE_KEYBOARD
         
         # Универсальная отправка сообщения - либо редактируем, либо отправляем новое
-        if update.callback_query:
-            await update.callback_query.edit_message_text(
-                manage_text,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await update.message.reply_text(
-                manage_text,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
+        await AdminHandlers._reply(update, manage_text, reply_markup=keyboard, parse_mode=_MD)
     
     @staticmethod
-    async def admin_promo_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Настройки промокодов"""
+    async def admin_promo_settings(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                   discount: int = None, duration: int = None):
+        """
+        Настройки промокодов
+        
+        Args:
+            discount: Только что сохраненный процент скидки (не запрашивается повторно)
+            duration: Только что сохраненный срок действия (не запрашивается повторно)
+        """
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        # Получаем текущие настройки из базы данных
-        current_discount = await db.settings.get_promo_discount_percent()
-        current_duration = await db.settings.get_promo_duration_days()
+        # Получаем из базы данных только неизвестные настройки
+        current_discount = discount if discount is not None else await db.settings.get_promo_discount_percent()
+        current_duration = duration if duration is not None else await db.settings.get_promo_duration_days()
         
         settings_text = f"""
 **Настройки промокодов**
@@ -232,25 +654,10 @@ class AdminHandlers:
 Изменения вступают в силу немедленно.
         """
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("📈 Изменить процент скидки", callback_data="admin_set_discount")],
-            [InlineKeyboardButton("📅 Изменить срок действия", callback_data="admin_set_duration")],
-            [InlineKeyboardButton("← Назад", callback_data="admin_promo_manage")]
-        ])
+        keyboard = AdminHandlers._PROMO_SETTINGS_KEYBOARD
         
         # Универсальная отправка сообщения - либо редактируем, либо отправляем новое
-        if update.callback_query:
-            await update.callback_query.edit_message_text(
-                settings_text,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await update.message.reply_text(
-                settings_text,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
+        await AdminHandlers._reply(update, settings_text, reply_markup=keyboard, parse_mode=_MD)
     
     @staticmethod
     async def admin_set_discount(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -268,9 +675,7 @@ class AdminHandlers:
 
 Введите новый размер скидки (от 1 до 99):
             """,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("Отменить", callback_data="admin_promo_settings")]
-            ])
+            reply_markup=AdminHandlers._CANCEL_TO_SETTINGS_KEYBOARD
         )
         
         # Устанавливаем состояние для ожидания ввода
@@ -292,9 +697,7 @@ class AdminHandlers:
 
 Введите новый срок действия в днях (от 1 до 365):
             """,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("Отменить", callback_data="admin_promo_settings")]
-            ])
+            reply_markup=AdminHandlers._CANCEL_TO_SETTINGS_KEYBOARD
         )
         
         # Устанавливаем состояние для ожидания ввода
@@ -306,28 +709,29 @@ class AdminHandlers:
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        unsynced_codes = await db.promo.get_unsynced_promocodes()
+        # Показываем первые 10, остальные только считаем
+        unsynced_codes, unsynced_total = await asyncio.gather(
+            db.promo.get_unsynced_promocodes(limit=10),
+            db.promo.count_unsynced_promocodes()
+        )
         
         if unsynced_codes:
             unsynced_text = "📋 **Несинхронизированные промокоды:**\n\n"
             
-            for i, promo in enumerate(unsynced_codes[:10], 1):  # Показываем первые 10
+            for i, promo in enumerate(unsynced_codes, 1):
                 unsynced_text += f"{i}. `{promo['code']}` - {promo.get('sync_error', 'Ошибка неизвестна')}\n"
             
-            if len(unsynced_codes) > 10:
-                unsynced_text += f"\n... и еще {len(unsynced_codes) - 10} промокодов"
+            if unsynced_total > len(unsynced_codes):
+                unsynced_text += f"\n... и еще {unsynced_total - len(unsynced_codes)} промокодов"
         else:
             unsynced_text = "✅ **Все промокоды синхронизированы**\n\nНет промокодов требующих синхронизации с WooCommerce."
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔄 Обновить", callback_data="admin_list_unsynced")],
-            [InlineKeyboardButton("← Назад", callback_data="admin_woocommerce")]
-        ])
+        keyboard = AdminHandlers._UNSYNCED_KEYBOARD
         
         await update.callback_query.edit_message_text(
             unsynced_text,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_MD
         )
     
     @staticmethod
@@ -337,16 +741,8 @@ class AdminHandlers:
             return
         
         await update.callback_query.edit_message_text(
-            """
-**Отметить промокод использованным**
-
-Введите код промокода который нужно отметить как использованный:
-
-Пример: PLUMMYABC123
-            """,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("Отменить", callback_data="admin_promo_manage")]
-            ])
+            PROMO_MARK_USED_PROMPT,
+            reply_markup=AdminHandlers._CANCEL_TO_PROMO_MANAGE_KEYBOARD
         )
         
         # Устанавливаем состояние для ожидания ввода
@@ -360,79 +756,48 @@ class AdminHandlers:
         
         text = update.message.text.strip()
         
-        # Обработка ввода процента скидки
-        if context.user_data.get('waiting_for_discount'):
+        # Обработка ввода числовых настроек промокодов
+        for flag, (low, high, setter, success_text, field) in ADMIN_INPUT_STATES.items():
+            if not context.user_data.get(flag):
+                continue
+            
             try:
-                discount = int(text)
-                if 1 <= discount <= 99:
-                    # Сохраняем новое значение в базу данных
-                    success = await db.settings.set_promo_discount_percent(discount)
-                    
-                    if success:
-                        await update.message.reply_text(
-                            f"**Размер скидки обновлен**: {discount}%\n\n"
-                            f"Изменения вступят в силу для новых промокодов немедленно.\n"
-                            f"Старые промокоды остаются с прежней скидкой.",
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    else:
-                        await update.message.reply_text(
-                            "Ошибка при сохранении настройки. Попробуйте еще раз.",
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    context.user_data.pop('waiting_for_discount', None)
-                    
-                    # Возвращаемся к настройкам
-                    await AdminHandlers.admin_promo_settings(update, context)
-                    return
-                else:
-                    await update.message.reply_text("Введите число от 1 до 99")
-                    return
+                value = int(text)
             except ValueError:
                 await update.message.reply_text("Введите корректное число")
                 return
-        
-        # Обработка ввода срока действия
-        elif context.user_data.get('waiting_for_duration'):
-            try:
-                duration = int(text)
-                if 1 <= duration <= 365:
-                    # Сохраняем новое значение в базу данных
-                    success = await db.settings.set_promo_duration_days(duration)
-                    
-                    if success:
-                        await update.message.reply_text(
-                            f"**Срок действия обновлен**: {duration} дней\n\n"
-                            f"Изменения вступят в силу для новых промокодов немедленно.\n"
-                            f"Старые промокоды сохраняют свой прежний срок действия.",
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    else:
-                        await update.message.reply_text(
-                            "Ошибка при сохранении настройки. Попробуйте еще раз.",
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    context.user_data.pop('waiting_for_duration', None)
-                    
-                    # Возвращаемся к настройкам  
-                    await AdminHandlers.admin_promo_settings(update, context)
-                    return
-                else:
-                    await update.message.reply_text("Введите число от 1 до 365")
-                    return
-            except ValueError:
-                await update.message.reply_text("Введите корректное число")
+            
+            if not low <= value <= high:
+                await update.message.reply_text(f"Введите число от {low} до {high}")
                 return
+            
+            # Сохраняем новое значение в базу данных
+            success = await getattr(db.settings, setter)(value)
+            
+            if success:
+                await update.message.reply_text(success_text.format(value), parse_mode=_MD)
+            else:
+                await update.message.reply_text(
+                    "Ошибка при сохранении настройки. Попробуйте еще раз.",
+                    parse_mode=_MD
+                )
+            context.user_data.pop(flag, None)
+            
+            # Возвращаемся к настройкам
+            await AdminHandlers.admin_promo_settings(
+                update, context, **{field: value if success else None}
+            )
+            return
         
         # Обработка ввода промокода для отметки использованным
-        elif context.user_data.get('waiting_for_promo_code'):
+        if context.user_data.get('waiting_for_promo_code'):
             promo_code = text.upper().strip()
             
             try:
                 # Отправляем сообщение о начале обработки
                 processing_msg = await update.message.reply_text(
                     f"Обрабатываю промокод {promo_code}...",
-                    parse_mode=ParseMode.MARKDOWN
+                    parse_mode=_MD
                 )
                 
                 # Проверяем существование промокода и отмечаем как использованный
@@ -442,16 +807,30 @@ class AdminHandlers:
                     # Дополнительно проверяем синхронизацию с WooCommerce
                     try:
                         from utils.woocommerce import woo_manager, Config
-                        if Config.WOOCOMMERCE_ENABLED and woo_manager.is_enabled():
-                            # Небольшая задержка для завершения синхронизации
-                            await asyncio.sleep(1)
+                        sync_task = db.promo.get_woo_sync_task(promo_code)
+                        if Config.WOOCOMMERCE_ENABLED and woo_manager.is_enabled() and sync_task:
+                            # Ждем фоновую синхронизацию, но не дольше таймаута (сама задача не отменяется)
+                            try:
+                                woo_result = await asyncio.wait_for(
+                                    asyncio.shield(sync_task), timeout=WOO_SYNC_WAIT_TIMEOUT
+                                )
+                            except asyncio.TimeoutError:
+                                woo_result = None
                             
-                            result_message = f"""**Промокод {promo_code} отмечен как использованный**
+                            if woo_result is None:
+                                result_message = f"""**Промокод {promo_code} отмечен как использованный**
+
+✅ **Локальная база данных:** обновлена
+⏳ **Сайт (WooCommerce):** синхронизация продолжается в фоне"""
+                            elif woo_result["success"]:
+                                result_message = f"""**Промокод {promo_code} отмечен как использованный**
 
 ✅ **Локальная база данных:** обновлена
 ✅ **Сайт (WooCommerce):** синхронизирован
 
 Промокод больше не может быть использован на сайте."""
+                            else:
+                                raise RuntimeError(woo_result.get("error", "Unknown error"))
                         else:
                             result_message = f"""**Промокод {promo_code} отмечен как использованный**
 
@@ -469,12 +848,12 @@ class AdminHandlers:
                     
                     await processing_msg.edit_text(
                         result_message,
-                        parse_mode=ParseMode.MARKDOWN
+                        parse_mode=_MD
                     )
                 else:
                     await processing_msg.edit_text(
                         f"**Промокод {promo_code} не найден или уже использован**",
-                        parse_mode=ParseMode.MARKDOWN
+                        parse_mode=_MD
                     )
                 
                 context.user_data.pop('waiting_for_promo_code', None)
@@ -487,7 +866,7 @@ class AdminHandlers:
             except Exception as e:
                 await update.message.reply_text(
                     f"**Ошибка при обработке промокода:** {str(e)}",
-                    parse_mode=ParseMode.MARKDOWN
+                    parse_mode=_MD
                 )
                 return
     
@@ -508,38 +887,33 @@ class AdminHandlers:
             await update.message.reply_text("❌ Сообщение не может быть пустым")
             return
         
-        # Получаем список активных пользователей
-        active_users = await db.user.get_all_active_users()
+        # Получаем количество активных пользователей (сам список читается при отправке)
+        recipients = await db.user.get_active_users_count()
         
-        if not active_users:
+        if not recipients:
             await update.message.reply_text("❌ Нет активных пользователей для рассылки")
             return
         
         # Подтверждение рассылки
-        confirm_text = f"""
-📢 **Подтверждение рассылки**
-
-📝 **Текст сообщения:**
-{message_text}
-
-👥 **Получателей:** {len(active_users)} пользователей
-
-⚠️ Это действие нельзя отменить. Продолжить?
-        """
+        confirm_text = BROADCAST_CONFIRM_TEMPLATE.format(
+            message_text=message_text,
+            recipients=recipients
+        )
         
         keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("✅ Да, отправить", callback_data=f"confirm_broadcast_{len(active_users)}")],
+            [InlineKeyboardButton("✅ Да, отправить", callback_data=f"confirm_broadcast_{recipients}")],
             [InlineKeyboardButton("❌ Отменить", callback_data="admin_back_to_main")]
         ])
         
         # Сохраняем текст сообщения для рассылки
         context.user_data['broadcast_text'] = message_text
-        context.user_data['broadcast_users'] = active_users
+        context.user_data['broadcast_count'] = recipients
         
         await update.message.reply_text(
             confirm_text,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_MD,
+            disable_web_page_preview=True
         )
     
     @staticmethod
@@ -549,35 +923,54 @@ class AdminHandlers:
             return
         
         broadcast_text = context.user_data.get('broadcast_text')
-        active_users = context.user_data.get('broadcast_users', [])
+        recipients = context.user_data.get('broadcast_count', 0)
         
-        if not broadcast_text or not active_users:
+        if not broadcast_text or not recipients:
             await update.callback_query.edit_message_text("❌ Ошибка: данные рассылки не найдены")
             return
         
         await update.callback_query.edit_message_text(
-            f"📤 Запускаю рассылку для {len(active_users)} пользователей..."
+            f"📤 Запускаю рассылку для {recipients} пользователей..."
         )
         
-        # Выполняем рассылку
+        # Выполняем рассылку параллельно, не превышая лимит Telegram
+        message_text = f"📢 **Новости от {Config.SHOP_NAME}**\n\n{broadcast_text}"
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        rate_limiter = AsyncTokenBucket(BROADCAST_RATE_PER_SEC, burst=BROADCAST_RATE_PER_SEC)
+        
         sent_count = 0
-        failed_count = 0
+        failed_errors = Counter()  # Ошибки отправки по типу исключения
+        pending = set()
         
-        for user in active_users:
+        async def send(user_id: int):
+            nonlocal sent_count
             try:
+                await rate_limiter.acquire()
                 await context.bot.send_message(
-                    chat_id=user['user_id'],
-                    text=f"📢 **Новости от {Config.SHOP_NAME}**\n\n{broadcast_text}",
-                    parse_mode=ParseMode.MARKDOWN
+                    chat_id=user_id,
+                    text=message_text,
+                    parse_mode=_MD
                 )
                 sent_count += 1
-                
-                # Небольшая задержка между сообщениями
-                await context.application.create_task_coro(lambda: None)
-                
             except Exception as e:
-                failed_count += 1
-                print(f"Не удалось отправить сообщение пользователю {user['user_id']}: {e}")
+                failed_errors[type(e).__name__] += 1
+                logger.debug("Не удалось отправить сообщение пользователю %s: %s", user_id, e)
+            finally:
+                semaphore.release()
+        
+        # Пользователи читаются из БД по мере отправки, без загрузки всего списка
+        async for user in db.user.iter_active_users():
+            await semaphore.acquire()
+            task = asyncio.create_task(send(user['user_id']))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        
+        if pending:
+            await asyncio.gather(*pending)
+        failed_count = sum(failed_errors.values())
+        total_count = sent_count + failed_count
+        if failed_errors:
+            logger.warning(f"⚠️ Рассылка: не доставлено {failed_count} сообщений ({dict(failed_errors)})")
         
         # Результат рассылки
         result_text = f"""
@@ -586,16 +979,16 @@ class AdminHandlers:
 📊 **Результаты:**
 • ✅ Доставлено: {sent_count}
 • ❌ Не доставлено: {failed_count}
-• 📈 Успешность: {round(sent_count / len(active_users) * 100, 1)}%
+• 📈 Успешность: {round(sent_count / total_count * 100, 1) if total_count else 0}%
 
 Рассылка завершена {datetime.now().strftime('%H:%M:%S')}
         """
         
-        await update.callback_query.edit_message_text(result_text, parse_mode=ParseMode.MARKDOWN)
+        await update.callback_query.edit_message_text(result_text, parse_mode=_MD)
         
         # Очищаем данные рассылки
         context.user_data.pop('broadcast_text', None)
-        context.user_data.pop('broadcast_users', None)
+        context.user_data.pop('broadcast_count', None)
     
     @staticmethod
     async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -604,52 +997,35 @@ class AdminHandlers:
             return
         
         query = update.callback_query
-        await query.answer()
-        
         data = query.data
         
-        if data == "admin_broadcast":
-            await AdminHandlers.admin_broadcast_setup(update, context)
-        elif data == "admin_promo_manage":
-            await AdminHandlers.admin_promo_manage(update, context)
-        elif data == "admin_promo_settings":
-            await AdminHandlers.admin_promo_settings(update, context)
-        elif data == "admin_set_discount":
-            await AdminHandlers.admin_set_discount(update, context)
-        elif data == "admin_set_duration":
-            await AdminHandlers.admin_set_duration(update, context)
-        elif data == "admin_promo_mark_used":
-            await AdminHandlers.admin_promo_mark_used(update, context)
+        # Обработчики с всплывающим ответом сами вызывают answer (повторный answer Telegram отклоняет)
+        if data not in AdminHandlers._SELF_ANSWERING_CALLBACKS and not data.startswith("admin_notifications_test_"):
+            await query.answer()
+        
+        # Остальные обработчики редактируют сообщение в обход _edit_panel, сохраненный вариант панели устаревает
+        if (data not in AdminHandlers._PANEL_CALLBACKS
+                and not data.startswith(("admin_notifications_test_", "admin_monitoring_details:"))):
+            key = AdminHandlers._panel_key(update)
+            if key is not None:
+                _last_panel_render.pop(key, None)
+        
+        handler = AdminHandlers._CALLBACK_MAP.get(data)
+        if handler:
+            await handler(update, context)
+            return
+        
+        # Callback'и с параметром в суффиксе data
+        if data.startswith("admin_notifications_test_"):
+            suffix = data[len("admin_notifications_test_"):]
+            if suffix.isdigit():
+                await AdminHandlers.admin_notifications_test(update, context, int(suffix))
+        elif data.startswith("admin_monitoring_details:"):
+            suffix = data[len("admin_monitoring_details:"):]
+            if suffix.isdigit():
+                await AdminHandlers.admin_monitoring_details(update, context, int(suffix))
         elif data.startswith("confirm_broadcast_"):
             await AdminHandlers.admin_execute_broadcast(update, context)
-        elif data == "admin_notifications":
-            await AdminHandlers.admin_notifications(update, context)
-        elif data == "admin_notifications_start":
-            await AdminHandlers.admin_notifications_start(update, context)
-        elif data == "admin_notifications_stop":
-            await AdminHandlers.admin_notifications_stop(update, context)
-        elif data == "admin_notifications_test_5":
-            await AdminHandlers.admin_notifications_test(update, context, 5)
-        elif data == "admin_notifications_test_3":
-            await AdminHandlers.admin_notifications_test(update, context, 3)
-        elif data == "admin_notifications_test_1":
-            await AdminHandlers.admin_notifications_test(update, context, 1)
-        elif data == "admin_monitoring":
-            await AdminHandlers.admin_monitoring(update, context)
-        elif data == "admin_monitoring_start":
-            await AdminHandlers.admin_monitoring_start(update, context)
-        elif data == "admin_monitoring_stop":
-            await AdminHandlers.admin_monitoring_stop(update, context)
-        elif data == "admin_monitoring_test":
-            await AdminHandlers.admin_monitoring_test(update, context)
-        elif data == "admin_monitoring_details":
-            await AdminHandlers.admin_monitoring_details(update, context)
-        elif data == "admin_stats":
-            # Возвращаемся к главному меню статистики
-            await AdminHandlers.admin_stats(update, context)
-        elif data == "admin_back_to_main":
-            # Возвращаемся к главному меню статистики
-            await AdminHandlers.admin_stats(update, context)
     
     @staticmethod
     async def admin_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -658,38 +1034,7 @@ class AdminHandlers:
             await update.message.reply_text("❌ У вас нет доступа к админ-командам")
             return
         
-        help_text = """
-🔧 **Админ-панель PlummyPromo**
-
-📊 **Команды статистики:**
-/stats - Общая статистика бота
-/admin_help - Эта справка
-
-📢 **Рассылки:**
-• Через кнопку в /stats
-• Поддерживается Markdown разметка
-• Автоматическая проверка активных пользователей
-
-🎁 **Управление промокодами:**
-• Просмотр всех выданных промокодов
-• Отметка использованных промокодов
-• Статистика конверсии
-
-⚙️ **Настройки:**
-• Изменение скидки в .env файле
-• Включение/отключение рассылок
-• Настройка аналитики
-
-📊 **Аналитика включает:**
-• Источники трафика (UTM метки)
-• Конверсию по воронке
-• Статистику по дням
-• Эффективность промокодов
-
-❓ Вопросы по настройке? Проверьте README.md
-        """
-        
-        await update.message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(ADMIN_HELP_TEXT, parse_mode=_MD)
     
     # === ФУНКЦИИ МОНИТОРИНГА САЙТА ===
     
@@ -697,18 +1042,20 @@ class AdminHandlers:
     async def admin_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Панель управления системой уведомлений"""
         if not AdminHandlers.is_admin(update.effective_user.id):
-            await update.callback_query.edit_message_text(
+            await AdminHandlers._edit_panel(
+                update,
                 "У вас нет доступа к этой команде"
             )
             return
         
         try:
-            # Динамически импортируем систему уведомлений
-            from utils.notifications import notification_system
+            notification_system = notifications_module.notification_system
             
             if not notification_system:
-                await update.callback_query.edit_message_text(
-                    "❌ Система уведомлений не инициализирована\nУведомления будут доступны после перезапуска бота."
+                await AdminHandlers._edit_panel(
+                    update,
+                    "❌ Система уведомлений не инициализирована\nУведомления будут доступны после перезапуска бота.",
+                    disable_web_page_preview=True
                 )
                 return
             
@@ -717,54 +1064,30 @@ class AdminHandlers:
             
             status_text = "🟢 Работает автоматически" if stats.get('is_running', False) else "🔴 Не активна"
             
-            message = f"""**Система уведомлений о промокодах**
-
-**Статус:** {status_text}
-**Режим:** Автоматический (всегда включен)
-
-**Статистика:**
-• Активных промокодов: {stats.get('total_active_promos', 0)}
-• Уведомлений за 5 дней: {stats.get('notifications_5_days', 0)}  
-• Уведомлений за 3 дня: {stats.get('notifications_3_days', 0)}
-• Уведомлений за 1 день: {stats.get('notifications_1_day', 0)}
-
-**Тексты уведомлений (БЕЗ изображений):**
-
-**За 5 дней:**
-_Ваш промокод истечет через 5 дней
-Успейте заказать без комиссии!
-<a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">Plummy.ru</a>_
-
-**За 3 дня:**
-_По промокоду мы гарантируем САМЫЕ НИЗКИЕ цены на оригинальные вещи._
-
-**За 1 день:**
-_Ваш промокод истечет через 24 часа
-Не упустите свой шанс!
-<a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">Plummy.ru</a>_
-
-ℹ️ **Уведомления отправляются автоматически всем пользователям с активными промокодами, кроме заблокированных или использовавших промокоды.**"""
+            message = NOTIFICATIONS_PANEL_TEMPLATE.format(
+                status_text=status_text,
+                total_active_promos=stats.get('total_active_promos', 0),
+                notifications_5_days=stats.get('notifications_5_days', 0),
+                notifications_3_days=stats.get('notifications_3_days', 0),
+                notifications_1_day=stats.get('notifications_1_day', 0)
+            )
 
             # Кнопки управления (БЕЗ кнопок запуска/остановки)
-            keyboard_buttons = [
-                [InlineKeyboardButton("🧪 Тест (5 дн.)", callback_data="admin_notifications_test_5"),
-                 InlineKeyboardButton("🧪 Тест (3 дн.)", callback_data="admin_notifications_test_3"),
-                 InlineKeyboardButton("🧪 Тест (1 дн.)", callback_data="admin_notifications_test_1")],
-                [InlineKeyboardButton("🔄 Обновить", callback_data="admin_notifications")],
-                [InlineKeyboardButton("⬅ Назад", callback_data="admin_stats")]
-            ]
-            
-            keyboard = InlineKeyboardMarkup(keyboard_buttons)
+            keyboard = AdminHandlers._NOTIFICATIONS_KEYBOARD
             
-            await update.callback_query.edit_message_text(
+            await AdminHandlers._edit_panel(
+                update,
                 message,
                 reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=_HTML,
+                disable_web_page_preview=True
             )
             
         except Exception as e:
-            await update.callback_query.edit_message_text(
-                f"Ошибка получения статистики уведомлений: {str(e)}"
+            await AdminHandlers._edit_panel(
+                update,
+                f"Ошибка получения статистики уведомлений: {_format_error(e)}",
+                disable_web_page_preview=True
             )
     
     @staticmethod
@@ -773,7 +1096,11 @@ _Ваш промокод истечет через 24 часа
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        await update.callback_query.answer("ℹ️ Система уведомлений работает автоматически и не требует запуска вручную!", show_alert=True)
+        await update.callback_query.answer(
+            "ℹ️ Система уведомлений работает автоматически и не требует запуска вручную!",
+            show_alert=True,
+            cache_time=NOTIFICATIONS_ALERT_CACHE_TIME
+        )
         
         # Возвращаемся к панели уведомлений
         await AdminHandlers.admin_notifications(update, context)
@@ -784,7 +1111,11 @@ _Ваш промокод истечет через 24 часа
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        await update.callback_query.answer("ℹ️ Система уведомлений работает автоматически и не может быть остановлена вручную!", show_alert=True)
+        await update.callback_query.answer(
+            "ℹ️ Система уведомлений работает автоматически и не может быть остановлена вручную!",
+            show_alert=True,
+            cache_time=NOTIFICATIONS_ALERT_CACHE_TIME
+        )
         
         # Возвращаемся к панели уведомлений  
         await AdminHandlers.admin_notifications(update, context)
@@ -796,8 +1127,7 @@ _Ваш промокод истечет через 24 часа
             return
         
         try:
-            # Динамически импортируем систему уведомлений
-            from utils.notifications import notification_system
+            notification_system = notifications_module.notification_system
             
             if notification_system:
                 success = await notification_system.send_test_notification(
@@ -810,10 +1140,17 @@ _Ваш промокод истечет через 24 часа
                 else:
                     await update.callback_query.answer("❌ Ошибка отправки тестового уведомления!", show_alert=True)
             else:
-                await update.callback_query.answer("❌ Система уведомлений не инициализирована!", show_alert=True)
+                await update.callback_query.answer(
+                    "❌ Система уведомлений не инициализирована!",
+                    show_alert=True,
+                    cache_time=NOTIFICATIONS_ALERT_CACHE_TIME
+                )
                 
         except Exception as e:
-            await update.callback_query.answer(f"❌ Ошибка: {str(e)}", show_alert=True)
+            await update.callback_query.answer(
+                f"❌ Ошибка: {_format_error(e, CALLBACK_ALERT_ERROR_LIMIT)}",
+                show_alert=True
+            )
     
     @staticmethod
     async def admin_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -821,77 +1158,67 @@ _Ваш промокод истечет через 24 часа
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        # Динамически импортируем систему мониторинга
-        from utils.monitoring import site_monitoring
+        site_monitoring = monitoring_module.site_monitoring
         
         if not site_monitoring:
-            await update.callback_query.edit_message_text(
-                "❌ **Система мониторинга не инициализирована**\n\n"
-                "Мониторинг будет доступен после перезапуска бота.",
-                parse_mode=ParseMode.MARKDOWN
+            await AdminHandlers._edit_panel(
+                update,
+                MONITORING_NOT_INITIALIZED_TEXT,
+                parse_mode=_HTML,
+                disable_web_page_preview=True
             )
             return
         
-        # Получаем статус мониторинга
-        status = await site_monitoring.get_monitoring_status()
+        # Получаем статус мониторинга (повторные обновления панели берутся из кэша)
+        status, is_stale = await AdminHandlers._get_monitoring_status(site_monitoring)
         
-        if not status['enabled']:
-            message = (
-                "❌ **Мониторинг сайта недоступен**\n\n"
-                f"Ошибка: {status.get('error', 'Неизвестная ошибка')}\n\n"
-                "Проверьте настройки UptimeRobot в конфигурации."
+        if status is None:
+            message = MONITORING_TIMEOUT_TEXT
+            keyboard = AdminHandlers._MONITORING_RETRY_KEYBOARD
+        elif not status['enabled']:
+            message = MONITORING_UNAVAILABLE_TEMPLATE.format(
+                error=html.escape(status.get('error', 'Неизвестная ошибка'))
             )
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("Назад", callback_data="admin_back_to_main")]
-            ])
+            keyboard = AdminHandlers._BACK_TO_MAIN_KEYBOARD
         else:
             # Формируем сообщение со статусом
-            monitoring_status = "🟢 Активен" if status['is_monitoring'] else "🛑 Остановлен"
-            api_status = "✅ OK" if status['api_status'] == 'OK' else f"❌ {status['api_status']}"
+            monitoring_status = _MONITORING_STATE_TEXT[status['is_monitoring']]
+            api_status = "✅ OK" if status['api_status'] == 'OK' else "❌ " + html.escape(status['api_status'])
             
-            message = (
-                f"📊 **Мониторинг сайта**\n\n"
-                f"**Статус:** {monitoring_status}\n"
-                f"**API UptimeRobot:** {api_status}\n"
-                f"**Мониторов:** {status['monitors_count']}\n"
-                f"**Интервал проверки:** {status['check_interval']} сек\n"
-                f"**Уведомлений отправлено:** {status['notification_count']}\n"
+            parts = [MONITORING_STALE_NOTICE] if is_stale else []
+            parts.append(
+                f"📊 <b>Мониторинг сайта</b>\n\n"
+                f"<b>Статус:</b> {monitoring_status}\n"
+                f"<b>API UptimeRobot:</b> {api_status}\n"
+                f"<b>Мониторов:</b> {status['monitors_count']}\n"
+                f"<b>Интервал проверки:</b> {status['check_interval']} сек\n"
+                f"<b>Уведомлений отправлено:</b> {status['notification_count']}\n"
             )
             
             if status['last_check']:
-                message += f"**Последняя проверка:** {status['last_check'][:19]}\n"
+                parts.append(f"<b>Последняя проверка:</b> {_format_check_time(status['last_check'])}\n")
                 
             # Добавляем информацию о мониторах
-            if status['monitors']:
-                message += "\n**Мониторы:**\n"
-                for monitor in status['monitors'][:3]:  # Показываем только первые 3
-                    status_icon = "🟢" if monitor['is_up'] else "🔴"
-                    message += f"{status_icon} {monitor['friendly_name']}\n"
-                
-                if len(status['monitors']) > 3:
-                    message += f"... и еще {len(status['monitors']) - 3}\n"
+            # (строки кэшируются по составу и статусам мониторов)
+            monitors = status['monitors']
+            if monitors:
+                preview = tuple(
+                    (monitor['friendly_name'], monitor['is_up'])
+                    for monitor in islice(monitors, MONITORING_PREVIEW_COUNT)
+                )
+                parts.append(_render_monitors_preview(preview, len(monitors)))
             
-            # Создаем клавиатуру в зависимости от статуса
-            if status['is_monitoring']:
-                keyboard_buttons = [
-                    [InlineKeyboardButton("🛑 Остановить мониторинг", callback_data="admin_monitoring_stop")],
-                    [InlineKeyboardButton("📊 Подробная информация", callback_data="admin_monitoring_details")],
-                    [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring")]
-                ]
-            else:
-                keyboard_buttons = [
-                    [InlineKeyboardButton("🚀 Запустить мониторинг", callback_data="admin_monitoring_start")],
-                    [InlineKeyboardButton("🧪 Тест подключения", callback_data="admin_monitoring_test")],
-                    [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring")]
-                ]
-                
-            keyboard_buttons.append([InlineKeyboardButton("← Назад", callback_data="admin_back_to_main")])
-            keyboard = InlineKeyboardMarkup(keyboard_buttons)
+            message = "".join(parts)
+            
+            # Клавиатура в зависимости от статуса
+            keyboard = AdminHandlers._MONITORING_KEYBOARDS[status['is_monitoring']]
         
-        await update.callback_query.edit_message_text(
+        await AdminHandlers._edit_panel(
+            update,
             message,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_HTML,
+            disable_web_page_preview=True
         )
     
     @staticmethod
@@ -900,45 +1227,32 @@ _Ваш промокод истечет через 24 часа
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        # Динамически импортируем систему мониторинга
-        from utils.monitoring import site_monitoring
+        site_monitoring = monitoring_module.site_monitoring
             
         if not site_monitoring:
             await update.callback_query.edit_message_text(
-                "❌ Система мониторинга не инициализирована",
-                parse_mode=ParseMode.MARKDOWN
+                MONITORING_NOT_INITIALIZED_TEXT,
+                parse_mode=_HTML,
+                disable_web_page_preview=True
             )
             return
         
-        # Показываем процесс запуска
-        await update.callback_query.edit_message_text(
-            "🚀 **Запуск мониторинга...**\n\nПожалуйста, подождите...",
-            parse_mode=ParseMode.MARKDOWN
+        success = await AdminHandlers._await_with_placeholder(
+            update,
+            site_monitoring.start_monitoring(),
+            MONITORING_START_WAIT_TEXT
         )
+        _monitoring_status_cache.invalidate()
         
-        success = await site_monitoring.start_monitoring()
+        message = MONITORING_START_OK_TEXT if success else MONITORING_START_FAIL_TEXT
         
-        if success:
-            message = (
-                "✅ **Мониторинг запущен успешно!**\n\n"
-                "Система начала отслеживать состояние сайта.\n"
-                "Вы будете получать уведомления при изменении статуса."
-            )
-        else:
-            message = (
-                "❌ **Ошибка запуска мониторинга**\n\n"
-                "Не удалось запустить систему мониторинга.\n"
-                "Проверьте настройки UptimeRobot API."
-            )
-        
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
-        ])
+        keyboard = AdminHandlers._BACK_TO_MONITORING_KEYBOARD
         
         await update.callback_query.edit_message_text(
             message,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_HTML,
+            disable_web_page_preview=True
         )
     
     @staticmethod
@@ -947,39 +1261,27 @@ _Ваш промокод истечет через 24 часа
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        # Динамически импортируем систему мониторинга
-        from utils.monitoring import site_monitoring
+        site_monitoring = monitoring_module.site_monitoring
             
         if not site_monitoring:
             return
         
-        await update.callback_query.edit_message_text(
-            "🛑 **Остановка мониторинга...**\n\nПожалуйста, подождите...",
-            parse_mode=ParseMode.MARKDOWN
+        success = await AdminHandlers._await_with_placeholder(
+            update,
+            site_monitoring.stop_monitoring(),
+            MONITORING_STOP_WAIT_TEXT
         )
+        _monitoring_status_cache.invalidate()
         
-        success = await site_monitoring.stop_monitoring()
+        message = MONITORING_STOP_OK_TEXT if success else MONITORING_STOP_FAIL_TEXT
         
-        if success:
-            message = (
-                "✅ **Мониторинг остановлен**\n\n"
-                "Система больше не отслеживает состояние сайта.\n"
-                "Уведомления отправляться не будут."
-            )
-        else:
-            message = (
-                "❌ **Ошибка остановки мониторинга**\n\n"
-                "Возможно, мониторинг уже был остановлен."
-            )
-        
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
-        ])
+        keyboard = AdminHandlers._BACK_TO_MONITORING_KEYBOARD
         
         await update.callback_query.edit_message_text(
             message,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_HTML,
+            disable_web_page_preview=True
         )
     
     @staticmethod
@@ -988,87 +1290,134 @@ _Ваш промокод истечет через 24 часа
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        await update.callback_query.edit_message_text(
-            "🧪 **Тестирование подключения...**\n\nПроверяем связь с UptimeRobot API...",
-            parse_mode=ParseMode.MARKDOWN
+        test_result = await AdminHandlers._await_with_placeholder(
+            update,
+            uptime_manager.test_connection(),
+            MONITORING_TEST_WAIT_TEXT
         )
         
-        test_result = await uptime_manager.test_connection()
-        
         if test_result['success']:
-            message = (
-                f"✅ **Подключение успешно!**\n\n"
-                f"**Статус API:** Работает\n"
-                f"**Найдено мониторов:** {test_result.get('monitors_count', 0)}\n\n"
-                f"{test_result.get('message', '')}"
+            message = MONITORING_TEST_OK_TEMPLATE.format(
+                monitors_count=test_result.get('monitors_count', 0),
+                message=html.escape(test_result.get('message', ''))
             )
         else:
-            message = (
-                f"❌ **Ошибка подключения**\n\n"
-                f"**Проблема:** {test_result.get('error', 'Неизвестная ошибка')}\n\n"
-                f"Проверьте:\n"
-                f"• API ключ в настройках\n"
-                f"• Подключение к интернету\n"
-                f"• Настройки UptimeRobot"
+            message = MONITORING_TEST_FAIL_TEMPLATE.format(
+                error=html.escape(str(test_result.get('error') or 'Неизвестная ошибка'))
             )
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
-        ])
+        keyboard = AdminHandlers._BACK_TO_MONITORING_KEYBOARD
         
         await update.callback_query.edit_message_text(
             message,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=_HTML,
+            disable_web_page_preview=True
         )
     
     @staticmethod 
-    async def admin_monitoring_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Подробная информация о мониторинге"""
+    async def admin_monitoring_details(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 0):
+        """Подробная информация о мониторинге (по MONITORING_DETAILS_PAGE_SIZE мониторов на странице)"""
         if not AdminHandlers.is_admin(update.effective_user.id):
             return
         
-        # Динамически импортируем систему мониторинга
-        from utils.monitoring import site_monitoring
+        site_monitoring = monitoring_module.site_monitoring
             
         if not site_monitoring:
             return
         
-        status = await site_monitoring.get_monitoring_status()
-        recent_notifications = await site_monitoring.get_recent_notifications(5)
-        
-        message = f"📊 **Подробная информация о мониторинге**\n\n"
-        
-        # Информация о мониторах
-        if status['monitors']:
-            message += "**Мониторы:**\n"
-            for monitor in status['monitors']:
-                status_icon = "🟢" if monitor['is_up'] else "🔴"
-                uptime = monitor.get('uptime_ratio', '0')
-                message += (
-                    f"{status_icon} **{monitor['friendly_name']}**\n"
-                    f"   URL: `{monitor['url']}`\n"
-                    f"   Статус: {monitor['status_description']}\n"
-                    f"   Uptime: {uptime}%\n\n"
-                )
+        try:
+            (status, is_stale), recent_notifications = await asyncio.gather(
+                AdminHandlers._get_monitoring_status(site_monitoring),
+                site_monitoring.get_recent_notifications(5)
+            )
+        except Exception as e:
+            await AdminHandlers._edit_panel(
+                update,
+                f"Ошибка получения информации о мониторинге: {_format_error(e)}",
+                reply_markup=AdminHandlers._BACK_TO_MONITORING_KEYBOARD,
+                disable_web_page_preview=True
+            )
+            return
+        
+        if status is None:
+            await AdminHandlers._edit_panel(
+                update,
+                MONITORING_TIMEOUT_TEXT,
+                reply_markup=AdminHandlers._MONITORING_DETAILS_KEYBOARD,
+                parse_mode=_HTML,
+                disable_web_page_preview=True
+            )
+            return
+        
+        monitors = status.get('monitors') or []
+        pages = max(1, -(-len(monitors) // MONITORING_DETAILS_PAGE_SIZE))
+        page = min(page, pages - 1)
+        
+        parts = [MONITORING_STALE_NOTICE] if is_stale else []
+        parts.append("📊 <b>Подробная информация о мониторинге</b>\n\n")
+        if pages > 1:
+            parts.append(f"Страница {page + 1} из {pages}\n\n")
+        
+        # Информация о мониторах текущей страницы
+        if monitors:
+            start = page * MONITORING_DETAILS_PAGE_SIZE
+            parts.append(_render_monitors_details(tuple(
+                (monitor['friendly_name'], monitor['url'], monitor['status_description'],
+                 monitor['is_up'], monitor.get('uptime_ratio', '0'))
+                for monitor in islice(monitors, start, start + MONITORING_DETAILS_PAGE_SIZE)
+            )))
         
         # Последние уведомления
         if recent_notifications:
-            message += "**Последние уведомления:**\n"
+            parts.append("<b>Последние уведомления:</b>\n")
             for notif in recent_notifications[-3:]:
                 timestamp = notif['timestamp'].strftime('%H:%M:%S')
-                message += f"• {timestamp}: {notif['friendly_name']} -> {notif['status_change']['current_status']}\n"
+                parts.append(f"• {timestamp}: {html.escape(notif['friendly_name'])} -&gt; {notif['status_change']['current_status']}\n")
         else:
-            message += "**Уведомлений пока нет**\n"
+            parts.append("<b>Уведомлений пока нет</b>\n")
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔄 Обновить", callback_data="admin_monitoring_details")],
-            [InlineKeyboardButton("← Назад к мониторингу", callback_data="admin_monitoring")]
-        ])
+        message = "".join(parts)
         
-        await update.callback_query.edit_message_text(
+        if pages > 1:
+            keyboard = _monitoring_details_keyboard(page, pages)
+        else:
+            keyboard = AdminHandlers._MONITORING_DETAILS_KEYBOARD
+        
+        await AdminHandlers._edit_panel(
+            update,
             message,
             reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN,
+            parse_mode=_HTML,
             disable_web_page_preview=True
         )
+    
+    # Callback'и, которые редактируют сообщение только через _edit_panel
+    _PANEL_CALLBACKS = frozenset((
+        "admin_notifications", "admin_notifications_start", "admin_notifications_stop",
+        "admin_monitoring", "admin_monitoring_details"
+    ))
+    
+    # Callback'и, обработчики которых отвечают всплывающим сообщением сами
+    _SELF_ANSWERING_CALLBACKS = frozenset(("admin_notifications_start", "admin_notifications_stop"))
+    
+    # Обработчики callback'ов по точному значению data (заполняется при определении класса)
+    _CALLBACK_MAP = {
+        "admin_broadcast": admin_broadcast_setup,
+        "admin_promo_manage": admin_promo_manage,
+        "admin_promo_settings": admin_promo_settings,
+        "admin_set_discount": admin_set_discount,
+        "admin_set_duration": admin_set_duration,
+        "admin_promo_mark_used": admin_promo_mark_used,
+        "admin_notifications": admin_notifications,
+        "admin_notifications_start": admin_notifications_start,
+        "admin_notifications_stop": admin_notifications_stop,
+        "admin_monitoring": admin_monitoring,
+        "admin_monitoring_start": admin_monitoring_start,
+        "admin_monitoring_stop": admin_monitoring_stop,
+        "admin_monitoring_test": admin_monitoring_test,
+        "admin_monitoring_details": admin_monitoring_details,
+        # Возврат к главному меню статистики
+        "admin_stats": admin_stats,
+        "admin_back_to_main": admin_stats,
+    }
@@ -2,12 +2,16 @@
 Обработчики для пользователей бота PlummyPromo
 """
 
+import asyncio
+import logging
+from enum import Enum
+
 from telegram import Update, ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from datetime import datetime, timedelta
 
-from database.database import db
+from database.database import get_db
 from data.faq import get_faq_categories, get_category_questions, search_faq
 from utils.config import Config
 from utils.analytics import AnalyticsHelper
@@ -15,18 +19,141 @@ from utils.promo import PromoCodeGenerator
 from utils.woocommerce import woo_manager
 from utils.media import media_manager
 
+db = get_db()
+logger = logging.getLogger(__name__)
+
+# Сайт магазина с UTM-метками бота
+SITE_URL = "http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot"
+
+# Кнопки основной клавиатуры
+PROMO_BUTTON_TEXT = "Получить промокод"
+FAQ_BUTTON_TEXT = "FAQ"
+SUPPORT_BUTTON_TEXT = "Поддержка"
+
+# Статические тексты (значения Config подставляются один раз при импорте)
+WELCOME_TEXT = """Добро пожаловать в Plummy!
+
+Мы делаем заказ одежды из зарубежных магазинов простым и выгодным. Тысячи товаров в каталоге и быстрый выкуп любой вещи под заказ.
+
+Нажми на «Получить промокод»."""
+
+HELP_TEXT = f"""
+🤖 **Помощь по боту {Config.SHOP_NAME}**
+
+**🎁 Основная функция:** Получение персональных промокодов со скидкой {Config.PROMO_DISCOUNT_PERCENT}%
+
+📋 **Команды:**
+• /start - Начать работу с ботом
+• /promo - Получить промокод  
+• /faq - Часто задаваемые вопросы
+• /help - Показать эту справку
+
+🔘 **Кнопки:**
+• **Получить промокод** - Получить уникальную скидку
+• **FAQ** - Ответы на вопросы о магазине
+• **Поддержка** - Связь с нашей службой поддержки
+
+💡 **Как пользоваться:**
+1. Нажми "Получить промокод"
+2. Скопируй код и используй при покупке на {Config.SHOP_URL}  
+3. При вопросах жми "FAQ" или "Поддержка"
+
+🛍 **Сайт магазина:** {Config.SHOP_URL}
+        """
+
+FAQ_TEXT = """<b><a href="https://yandex.ru/profile/35414701593">Отзывы</a></b>
+
+<b>В каталоге нет того, что я хочу заказать</b>
+
+У нас можно заказать не только из каталога, но и просто заполнив форму на выкуп <a href="http://plummy.ru/buyout?utm_source=telegram&utm_medium=social&utm_campaign=bot">plummy.ru/buyout</a>
+
+<b>Как выбрать размер?</b>
+
+В нашем каталоге мы показываем размеры обуви в EU, одежду – в стандартной размерной сетке бренда. Если у вас появились трудности с выбором размера – напишите менеджеру, он поможет.
+
+<b>Может ли прийти не оригинальная вещь?</b>
+
+Такого не может произойти, так как мы выкупаем только из оригинальных бутиков, все товары имеют cеpтификаты пoдлинности и бирки.
+
+<b>Оформил заказ на сайте, что делать дальше?</b>
+
+С вами оперативно свяжется наш менеджер, чтобы подтвердить заказ.
+
+<b>Можно вернуть, если не подошел размер / стиль?</b>
+
+Мы выкупаем товар из-за границы, и пока он доставляется, срок возврата в бутиках обычно заканчивается. Поэтому оформить моментальный возврат мы не можем. Однако мы можем принять вещь на реализацию — разместим её на наших и партнёрских площадках, продадим и вернём вам всю сумму после продажи."""
+
+SUPPORT_TEXT = "Вы всегда можете написать нашей службе поддержки в Telegram: @hey_plummy — рассчитать стоимость выкупа, уточнить по срокам и размерам, узнать статус заказа."
+
+# Шаблоны сообщений с промокодом (подстановка через format_map)
+PROMO_ACTIVE_TEMPLATE = """У вас уже есть активный промокод на {discount_percent}%!
+
+Код: <code>{code}</code>
+
+Истекает: {expiry}
+
+Как использовать:
+1️⃣ Перейдите на сайт <a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">plummy.ru</a>
+2️⃣ Выберите товары и добавьте в корзину / воспользуйтесь формой для выкупа
+3️⃣ При оформлении заказа введите промокод
+
+Его можно использовать только один раз."""
+
+PROMO_NEW_TEMPLATE = """🎉 Ваш персональный промокод на {discount_percent}% готов!
+
+Код: <code>{code}</code>
+
+Истекает: {expiry}
+
+Как использовать:
+1️⃣ Перейдите на сайт <a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">plummy.ru</a>
+2️⃣ Выберите товары и добавьте в корзину / воспользуйтесь формой для выкупа
+3️⃣ При оформлении заказа введите промокод
+
+Его можно использовать только один раз."""
+
+
+class PromoOutcome(Enum):
+    """Итог обработки запроса промокода"""
+    USED = 'used'                  # Пользователь уже использовал промокод
+    EXPIRED = 'expired'            # Все промокоды истекли
+    ACTIVE_SHOWN = 'active_shown'  # Показан действующий промокод
+    NEW_ISSUED = 'new_issued'      # Выдан новый промокод
+    ERROR = 'error'                # Ошибка создания промокода
+
+
+# Изображение для итога (None - сообщение без изображения)
+PROMO_OUTCOME_EVENTS = {
+    PromoOutcome.USED: 'done',
+    PromoOutcome.EXPIRED: 'finish',
+    PromoOutcome.ACTIVE_SHOWN: 'promo',
+    PromoOutcome.NEW_ISSUED: 'promo',
+    PromoOutcome.ERROR: None,
+}
+
+# Для истекших и уже использованных промокодов кнопка перехода на сайт не нужна
+PROMO_OUTCOMES_WITHOUT_BUTTONS = frozenset({PromoOutcome.USED, PromoOutcome.EXPIRED})
+
 
 class UserHandlers:
     """Обработчики для пользователей"""
     
+    # Статические клавиатуры (создаются один раз при загрузке модуля)
+    _MAIN_KEYBOARD = ReplyKeyboardMarkup([
+        [PROMO_BUTTON_TEXT],
+        [FAQ_BUTTON_TEXT, SUPPORT_BUTTON_TEXT]
+    ], resize_keyboard=True)
+    _SITE_BUTTON_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Перейти на сайт", url=SITE_URL)]
+    ])
+    _BACK_TO_FAQ_KEYBOARD = InlineKeyboardMarkup([
+        [InlineKeyboardButton("← Назад к категориям", callback_data="back_to_faq")]
+    ])
+    
     @staticmethod
     def get_main_keyboard():
         """Получить основную клавиатуру"""
-        keyboard = [
-            ["Получить промокод"],
-            ["FAQ", "Поддержка"]
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return UserHandlers._MAIN_KEYBOARD
     
     @staticmethod
     async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -58,18 +185,11 @@ class UserHandlers:
             utm_data=utm_data
         )
         
-        # Приветственное сообщение с изображением
-        welcome_text = """Добро пожаловать в Plummy!
-
-Мы делаем заказ одежды из зарубежных магазинов простым и выгодным. Тысячи товаров в каталоге и быстрый выкуп любой вещи под заказ.
-
-Нажми на «Получить промокод»."""
-        
         # Отправляем приветственное изображение с текстом
         await media_manager.send_photo_with_text(
             update=update,
             event='hello',
-            text=welcome_text,
+            text=WELCOME_TEXT,
             parse_mode=ParseMode.HTML,
             reply_markup=UserHandlers.get_main_keyboard()
         )
@@ -77,32 +197,8 @@ class UserHandlers:
     @staticmethod
     async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /help"""
-        help_text = f"""
-🤖 **Помощь по боту {Config.SHOP_NAME}**
-
-**🎁 Основная функция:** Получение персональных промокодов со скидкой {Config.PROMO_DISCOUNT_PERCENT}%
-
-📋 **Команды:**
-• /start - Начать работу с ботом
-• /promo - Получить промокод  
-• /faq - Часто задаваемые вопросы
-• /help - Показать эту справку
-
-🔘 **Кнопки:**
-• **Получить промокод** - Получить уникальную скидку
-• **FAQ** - Ответы на вопросы о магазине
-• **Поддержка** - Связь с нашей службой поддержки
-
-💡 **Как пользоваться:**
-1. Нажми "Получить промокод"
-2. Скопируй код и используй при покупке на {Config.SHOP_URL}  
-3. При вопросах жми "FAQ" или "Поддержка"
-
-🛍 **Сайт магазина:** {Config.SHOP_URL}
-        """
-        
         await update.message.reply_text(
-            help_text,
+            HELP_TEXT,
             parse_mode=ParseMode.HTML
         )
     
@@ -112,27 +208,34 @@ class UserHandlers:
         try:
             user = update.effective_user
             
-            # Проверяем ВСЕ промокоды пользователя (включая использованные)
-            existing_codes = await db.promo.get_user_promo_codes(user.id)
+            # Проверяем ВСЕ промокоды пользователя (включая использованные) одним запросом
+            promo_state = await db.promo.get_user_promo_state(user.id)
+            used_codes = promo_state['used']
+            active_codes = promo_state['active']
             
-            if existing_codes:
+            if used_codes or active_codes:
                 # У пользователя уже есть промокоды, проверяем использовал ли он хотя бы один
-                used_codes = [code for code in existing_codes if code['is_used']]
-                active_codes = [code for code in existing_codes if not code['is_used']]
                 
                 # Опционально синхронизируем активные промокоды с WooCommerce (если включено)
+                woo_expiry_dates = {}  # Код -> дата истечения с сайта
                 try:
                     if Config.WOOCOMMERCE_ENABLED and woo_manager.is_enabled():
                         codes_to_remove = []  # Промокоды для удаления из активных
                         
-                        for active_code in active_codes:
-                            sync_result = await woo_manager.sync_coupon_status(
-                                active_code['code'], 
-                                active_code.get('woocommerce_id')
-                            )
+                        # Запросы к WooCommerce по всем активным промокодам выполняются параллельно
+                        sync_results = await asyncio.gather(*(
+                            woo_manager.sync_coupon_status(active_code['code'], active_code.get('woocommerce_id'))
+                            for active_code in active_codes
+                        ), return_exceptions=True)
+                        
+                        for active_code, sync_result in zip(active_codes, sync_results):
+                            if isinstance(sync_result, Exception):
+                                logger.warning(f"WooCommerce синхронизация недоступна для {active_code['code']}: {sync_result}")
+                                continue
                             
                             if sync_result.get("synced", False):
                                 # Промокод найден на сайте
+                                woo_expiry_dates[active_code['code']] = sync_result.get("expiry_date")
                                 if sync_result.get("is_used", False):
                                     # Промокод использован в WooCommerce, обновляем локальную базу
                                     await db.promo.use_promo_code(active_code['code'])
@@ -147,8 +250,7 @@ class UserHandlers:
                                     used_codes.append(active_code)
                                     codes_to_remove.append(active_code)
                                     
-                                    import logging
-                                    logging.getLogger(__name__).info(f"Промокод {active_code['code']} удален с сайта администратором, отмечен как использованный в боте")
+                                    logger.info(f"Промокод {active_code['code']} удален с сайта администратором, отмечен как использованный в боте")
                         
                         # Удаляем синхронизированные промокоды из списка активных
                         for code_to_remove in codes_to_remove:
@@ -156,11 +258,11 @@ class UserHandlers:
                                 active_codes.remove(code_to_remove)
                 except Exception as e:
                     # Если WooCommerce недоступен, продолжаем без синхронизации
-                    import logging
-                    logging.getLogger(__name__).warning(f"WooCommerce синхронизация недоступна: {e}")
+                    logger.warning(f"WooCommerce синхронизация недоступна: {e}")
                 
                 # Если пользователь использовал хотя бы один промокод - показываем сообщение "уже использовал"
                 if used_codes:
+                    outcome = PromoOutcome.USED
                     message_text = """Ты уже успешно использовал свой промокод, спасибо!
 
 Но даже без акций мы стараемся держать цены ниже чем у конкурентов, убедись в этом сам
@@ -170,25 +272,9 @@ class UserHandlers:
                     valid_active_codes = []
                     
                     for active_code in active_codes:
-                        # Сначала пытаемся получить РЕАЛЬНУЮ дату истечения с сайта (если WooCommerce включен)
-                        expiry_date = None
-                        
-                        if Config.WOOCOMMERCE_ENABLED and woo_manager.is_enabled():
-                            try:
-                                real_expiry_date = await woo_manager.get_coupon_expiry_date(active_code['code'])
-                                if real_expiry_date:
-                                    # Используем реальную дату с сайта
-                                    expiry_date = real_expiry_date
-                            except Exception as e:
-                                # При ошибке WooCommerce используем локальный расчет (ниже)
-                                import logging
-                                logging.getLogger(__name__).warning(f"Ошибка получения даты истечения с WooCommerce для {active_code['code']}: {e}")
-                        
-                        # Fallback: рассчитываем дату по настройкам бота (если не получили с сайта)
-                        if not expiry_date:
-                            created_date = datetime.strptime(active_code['created_date'][:19], "%Y-%m-%d %H:%M:%S")
-                            duration_days = await db.settings.get_promo_duration_days()
-                            expiry_date = created_date + timedelta(days=duration_days)
+                        # РЕАЛЬНАЯ дата истечения с сайта уже получена при синхронизации (если WooCommerce включен),
+                        # иначе - дата по настройкам бота
+                        expiry_date = woo_expiry_dates.get(active_code['code']) or active_code['expiry_date']
                         
                         # Проверяем, не истек ли промокод
                         if datetime.now() <= expiry_date:
@@ -200,20 +286,15 @@ class UserHandlers:
                         expiry_formatted = expiry_date.strftime("%d.%m.%Y в %H:%M")
                         discount_percent = active_code.get('discount_percent', 5)
                         
-                        message_text = f"""У вас уже есть активный промокод на {discount_percent}%!
-
-Код: <code>{active_code['code']}</code>
-
-Истекает: {expiry_formatted}
-
-Как использовать:
-1️⃣ Перейдите на сайт <a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">plummy.ru</a>
-2️⃣ Выберите товары и добавьте в корзину / воспользуйтесь формой для выкупа
-3️⃣ При оформлении заказа введите промокод
-
-Его можно использовать только один раз."""
+                        outcome = PromoOutcome.ACTIVE_SHOWN
+                        message_text = PROMO_ACTIVE_TEMPLATE.format_map({
+                            "discount_percent": discount_percent,
+                            "code": active_code['code'],
+                            "expiry": expiry_formatted,
+                        })
                     else:
                         # Все промокоды истекли
+                        outcome = PromoOutcome.EXPIRED
                         message_text = """Срок действия промокода истек(
 
 Но даже без акций мы стараемся держать цены ниже чем у конкурентов, убедись в этом сам
@@ -233,56 +314,33 @@ class UserHandlers:
                         action_type='promo_request'
                     )
                     
-                    # Рассчитываем дату истечения из настроек
-                    duration_days = await db.settings.get_promo_duration_days()
-                    expiry_date = datetime.now() + timedelta(days=duration_days)
+                    # Рассчитываем дату истечения по сроку, прочитанному вместе с промокодами
+                    expiry_date = datetime.now() + timedelta(days=promo_state['duration_days'])
                     expiry_formatted = expiry_date.strftime("%d.%m.%Y в %H:%M")
                     
                     # Получаем процент скидки
                     discount_percent = await db.settings.get_promo_discount_percent()
                     
-                    message_text = f"""🎉 Ваш персональный промокод на {discount_percent}% готов!
-
-Код: <code>{promo_code}</code>
-
-Истекает: {expiry_formatted}
-
-Как использовать:
-1️⃣ Перейдите на сайт <a href="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot">plummy.ru</a>
-2️⃣ Выберите товары и добавьте в корзину / воспользуйтесь формой для выкупа
-3️⃣ При оформлении заказа введите промокод
-
-Его можно использовать только один раз."""
+                    outcome = PromoOutcome.NEW_ISSUED
+                    message_text = PROMO_NEW_TEMPLATE.format_map({
+                        "discount_percent": discount_percent,
+                        "code": promo_code,
+                        "expiry": expiry_formatted,
+                    })
                 except Exception as e:
+                    outcome = PromoOutcome.ERROR
                     message_text = """😔 Произошла ошибка при создании промокода.
 Попробуйте позже или обратитесь в поддержку."""
             
-            # Создаем кнопки в зависимости от ситуации пользователя
-            buttons = []
-            
-            # Для сообщений об истечении срока или об уже использованном промокоде кнопки не нужны
-            if "Срок действия промокода истек" in message_text or "уже успешно использовал" in message_text:
-                # Никаких кнопок для истекших или использованных промокодов
-                pass
+            # Кнопки и изображение определяются итогом обработки
+            if outcome in PROMO_OUTCOMES_WITHOUT_BUTTONS:
+                keyboard = None
             else:
                 # Показываем только кнопку перехода на сайт
-                buttons.append([InlineKeyboardButton("Перейти на сайт", url="http://plummy.ru/?utm_source=telegram&utm_medium=social&utm_campaign=bot")])
-            
-            # Создаем клавиатуру только если есть кнопки
-            keyboard = InlineKeyboardMarkup(buttons) if buttons else None
+                keyboard = UserHandlers._SITE_BUTTON_KEYBOARD
             
-            # Определяем какое изображение отправить в зависимости от типа сообщения
-            if "уже успешно использовал" in message_text:
-                # Пользователь уже использовал промокод - изображение done
-                event = 'done'
-            elif "Срок действия промокода истек" in message_text:
-                # Промокод истек - изображение finish
-                event = 'finish'  
-            elif ("персональный промокод готов" in message_text or 
-                  "У вас уже есть активный промокод" in message_text):
-                # Новый промокод или показ существующего - изображение promo
-                event = 'promo'
-            else:
+            event = PROMO_OUTCOME_EVENTS[outcome]
+            if event is None:
                 # Для остальных случаев (например, ошибки) отправляем без изображения
                 await update.message.reply_text(
                     message_text,
@@ -301,8 +359,7 @@ class UserHandlers:
             )
         except Exception as e:
             # Логируем ошибку для отладки
-            import logging
-            logging.getLogger(__name__).error(f"Ошибка в promo_command: {e}", exc_info=True)
+            logger.error(f"Ошибка в promo_command: {e}", exc_info=True)
             
             # Отправляем пользователю информативное сообщение
             error_message = """😔 Произошла ошибка при обработке вашего запроса.
@@ -323,41 +380,17 @@ class UserHandlers:
             action_type='faq_view'
         )
         
-        faq_text = """<b><a href="https://yandex.ru/profile/35414701593">Отзывы</a></b>
-
-<b>В каталоге нет того, что я хочу заказать</b>
-
-У нас можно заказать не только из каталога, но и просто заполнив форму на выкуп <a href="http://plummy.ru/buyout?utm_source=telegram&utm_medium=social&utm_campaign=bot">plummy.ru/buyout</a>
-
-<b>Как выбрать размер?</b>
-
-В нашем каталоге мы показываем размеры обуви в EU, одежду – в стандартной размерной сетке бренда. Если у вас появились трудности с выбором размера – напишите менеджеру, он поможет.
-
-<b>Может ли прийти не оригинальная вещь?</b>
-
-Такого не может произойти, так как мы выкупаем только из оригинальных бутиков, все товары имеют cеpтификаты пoдлинности и бирки.
-
-<b>Оформил заказ на сайте, что делать дальше?</b>
-
-С вами оперативно свяжется наш менеджер, чтобы подтвердить заказ.
-
-<b>Можно вернуть, если не подошел размер / стиль?</b>
-
-Мы выкупаем товар из-за границы, и пока он доставляется, срок возврата в бутиках обычно заканчивается. Поэтому оформить моментальный возврат мы не можем. Однако мы можем принять вещь на реализацию — разместим её на наших и партнёрских площадках, продадим и вернём вам всю сумму после продажи."""
-        
-        await update.message.reply_text(faq_text, parse_mode=ParseMode.HTML)
+        await update.message.reply_text(FAQ_TEXT, parse_mode=ParseMode.HTML)
     
     
     @staticmethod
     async def support_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик кнопки Поддержка"""
-        support_text = "Вы всегда можете написать нашей службе поддержки в Telegram: @hey_plummy — рассчитать стоимость выкупа, уточнить по срокам и размерам, узнать статус заказа."
-        
         # Отправляем изображение поддержки с текстом
         await media_manager.send_photo_with_text(
             update=update,
             event='help',
-            text=support_text
+            text=SUPPORT_TEXT
         )
     
     @staticmethod
@@ -389,14 +422,9 @@ class UserHandlers:
             text += f"**{i}. {question_data['question']}**\n"
             text += f"{question_data['answer']}\n\n"
         
-        # Кнопка назад
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("← Назад к категориям", callback_data="back_to_faq")]
-        ])
-        
         await update.callback_query.edit_message_text(
             text,
-            reply_markup=keyboard,
+            reply_markup=UserHandlers._BACK_TO_FAQ_KEYBOARD,
             parse_mode=ParseMode.HTML
         )
     
@@ -407,40 +435,26 @@ class UserHandlers:
         text = update.message.text
         user = update.effective_user
         
-        if text == "Получить промокод":
-            await UserHandlers.promo_command(update, context)
-        elif text == "FAQ":
-            await UserHandlers.faq_command(update, context)
-        elif text == "Поддержка":
-            await UserHandlers.support_command(update, context)
-        else:
-            # Проверяем, есть ли у пользователя промокод с запрошенной обратной связью
-            try:
-                async with db.manager.get_connection() as conn:
-                    cursor = await conn.execute("""
-                        SELECT code FROM promocodes 
-                        WHERE user_id = ? 
-                        AND feedback_requested = 1 
-                        AND is_used = 0
-                        AND code NOT IN (SELECT promo_code FROM feedback WHERE user_id = ?)
-                        ORDER BY feedback_request_date DESC
-                        LIMIT 1
-                    """, (user.id, user.id))
-                    result = await cursor.fetchone()
-                    
-                    if result:
-                        # У пользователя есть промокод с запрошенной обратной связью
-                        promo_code = result[0]
-                        # Обрабатываем обратную связь
-                        await UserHandlers.handle_feedback(update, context, text, promo_code)
-                    else:
-                        # Не отвечаем на произвольные сообщения
-                        # Пользователь должен использовать кнопки
-                        pass
-            except Exception as e:
-                import logging
-                logging.getLogger(__name__).error(f"Ошибка проверки обратной связи: {e}")
+        # Кнопки основной клавиатуры
+        handler = UserHandlers._TEXT_ROUTES.get(text)
+        if handler:
+            await handler(update, context)
+            return
+        
+        # Проверяем, есть ли у пользователя промокод с запрошенной обратной связью
+        try:
+            promo_code = await db.promo.get_pending_feedback_code(user.id)
+            
+            if promo_code:
+                # У пользователя есть промокод с запрошенной обратной связью
+                await UserHandlers.handle_feedback(update, context, text, promo_code)
+            else:
+                # Не отвечаем на произвольные сообщения
+                # Пользователь должен использовать кнопки
                 pass
+        except Exception as e:
+            logger.error(f"Ошибка проверки обратной связи: {e}")
+            pass
     
     @staticmethod
     async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE, feedback_text: str, promo_code: str = 'UNKNOWN'):
@@ -449,12 +463,7 @@ class UserHandlers:
         
         try:
             # Сохраняем обратную связь в базу данных
-            async with db.manager.get_connection() as conn:
-                await conn.execute("""
-                    INSERT INTO feedback (user_id, promo_code, feedback_text)
-                    VALUES (?, ?, ?)
-                """, (user.id, promo_code, feedback_text))
-                await conn.commit()
+            await db.promo.save_feedback(user.id, promo_code, feedback_text)
             
             # Формируем сообщение для администраторов
             user_contact = f"@{user.username}" if user.username else f"ID: {user.id}"
@@ -471,17 +480,18 @@ class UserHandlers:
 💬 Обратная связь:
 {feedback_text}"""
             
-            # Отправляем всем администраторам
-            for admin_id in Config.ADMIN_IDS:
-                try:
-                    await context.bot.send_message(
-                        chat_id=admin_id,
-                        text=admin_message,
-                        parse_mode=ParseMode.HTML
-                    )
-                except Exception as e:
-                    import logging
-                    logging.getLogger(__name__).error(f"Не удалось отправить обратную связь администратору {admin_id}: {e}")
+            # Отправляем всем администраторам параллельно
+            results = await asyncio.gather(*(
+                context.bot.send_message(
+                    chat_id=admin_id,
+                    text=admin_message,
+                    parse_mode=ParseMode.HTML
+                )
+                for admin_id in Config.ADMIN_IDS
+            ), return_exceptions=True)
+            for admin_id, result in zip(Config.ADMIN_IDS, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Не удалось отправить обратную связь администратору {admin_id}: {result}")
             
             # Благодарим пользователя
             await update.message.reply_text(
@@ -489,13 +499,18 @@ class UserHandlers:
                 parse_mode=ParseMode.HTML
             )
             
-            import logging
-            logging.getLogger(__name__).info(f"📝 Получена обратная связь от пользователя {user.id}")
+            logger.info(f"📝 Получена обратная связь от пользователя {user.id}")
             
         except Exception as e:
-            import logging
-            logging.getLogger(__name__).error(f"❌ Ошибка обработки обратной связи: {e}")
+            logger.error(f"❌ Ошибка обработки обратной связи: {e}")
             await update.message.reply_text(
                 "Произошла ошибка при отправке обратной связи. Попробуйте позже.",
                 parse_mode=ParseMode.HTML
             )
+    
+    # Обработчики кнопок основной клавиатуры по тексту сообщения (заполняется при определении класса)
+    _TEXT_ROUTES = {
+        PROMO_BUTTON_TEXT: promo_command,
+        FAQ_BUTTON_TEXT: faq_command,
+        SUPPORT_BUTTON_TEXT: support_command,
+    }
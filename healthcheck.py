@@ -1,37 +1,33 @@
 """
 Простой HTTP сервер для health-check облачных платформ
-Запускается в отдельном потоке вместе с ботом
+Работает в цикле событий бота (aiohttp), без отдельного потока
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import threading
-import os
+from aiohttp import web
 
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        """Обработка GET запросов"""
-        if self.path == '/' or self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"status": "healthy", "service": "PlummyPromo Bot"}')
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Отключаем логи HTTP сервера"""
-        pass
+# Ответ всегда одинаковый, тело собирается один раз при загрузке модуля
+HEALTH_BODY = b'{"status": "healthy", "service": "PlummyPromo Bot"}'
+
+
+async def health(request: web.Request) -> web.Response:
+    """Обработка GET запросов"""
+    return web.Response(body=HEALTH_BODY, content_type='application/json')
 
-def start_health_check_server(port=8080):
-    """Запуск health-check сервера в отдельном потоке"""
+
+async def start_health_check_server(port=8080) -> web.AppRunner:
+    """Запуск health-check сервера в текущем цикле событий (остановка - runner.cleanup())"""
+    app = web.Application()
+    app.router.add_get('/', health)
+    app.router.add_get('/health', health)
+    
+    # Логи HTTP сервера отключены
+    runner = web.AppRunner(app, access_log=None)
     try:
-        server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
-        thread = threading.Thread(target=server.serve_forever, daemon=True)
-        thread.start()
+        await runner.setup()
+        await web.TCPSite(runner, '0.0.0.0', port).start()
         print(f"✅ Health-check сервер запущен на порту {port}")
-        return server
+        return runner
     except Exception as e:
+        await runner.cleanup()
         print(f"⚠️ Ошибка запуска health-check сервера: {e}")
         raise
-
@@ -10,18 +10,29 @@ PlummyPromo Telegram Bot
 """
 
 import asyncio
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 
 # Импортируем наши модули
 from utils.config import Config
-from database.database import db
+from database.database import get_db
 from handlers.user import UserHandlers
 from handlers.admin import AdminHandlers
 from utils.monitoring import SiteMonitoring
 from utils.notifications import PromoNotificationSystem, notification_system
 
+db = get_db()
+
+# Пул HTTP-соединений к Bot API для отправки сообщений (getUpdates использует свой отдельный пул).
+# Рассчитан на рассылку (BROADCAST_CONCURRENCY) вместе с ответами пользователям и админ-панелью;
+# при кратковременной нехватке соединений запрос ждет освобождения до BOT_POOL_TIMEOUT секунд
+BOT_CONNECTION_POOL_SIZE = 64
+BOT_POOL_TIMEOUT = 10.0
+
 # Health-check сервер для облачных платформ
 try:
     from healthcheck import start_health_check_server
@@ -30,14 +41,21 @@ except ImportError:
     HEALTHCHECK_ENABLED = False
 
 
-# Настройка логирования
+# Настройка логирования: записи ставятся в очередь, а запись в файл и консоль
+# выполняется фоновым потоком и не блокирует цикл событий
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(
+    log_queue,
+    logging.FileHandler('bot.log', encoding='utf-8'),
+    logging.StreamHandler()
+)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
@@ -124,14 +142,15 @@ class PlummyPromoBot:
 
 async def main():
     """Главная асинхронная функция"""
+    health_runner = None
     try:
         logger.info("🚀 Запуск PlummyPromo Bot...")
         
-        # Запуск health-check сервера для облачных платформ
+        # Запуск health-check сервера для облачных платформ (в том же цикле событий)
         if HEALTHCHECK_ENABLED:
             try:
                 port = int(os.getenv('PORT', 8080))
-                start_health_check_server(port)
+                health_runner = await start_health_check_server(port)
                 logger.info(f"✅ Health-check сервер запущен на порту {port}")
             except Exception as e:
                 logger.warning(f"⚠️ Не удалось запустить health-check сервер: {e}")
@@ -146,7 +165,13 @@ async def main():
         
         # Создаем и настраиваем бота
         bot = PlummyPromoBot()
-        bot.application = Application.builder().token(Config.BOT_TOKEN).build()
+        bot.application = (
+            Application.builder()
+            .token(Config.BOT_TOKEN)
+            .connection_pool_size(BOT_CONNECTION_POOL_SIZE)
+            .pool_timeout(BOT_POOL_TIMEOUT)
+            .build()
+        )
         bot._register_handlers()
         
         # Инициализируем систему мониторинга сайта
@@ -212,6 +237,13 @@ async def main():
             await bot.application.updater.stop()
             await bot.application.stop()
             await bot.application.shutdown()
+            
+            # Закрываем общее соединение с базой данных
+            await db.close()
+            
+            # Останавливаем health-check сервер
+            if health_runner:
+                await health_runner.cleanup()
     
     except KeyboardInterrupt:
         logger.info("👋 Получен сигнал остановки от пользователя")
@@ -35,7 +35,8 @@ def setup_database():
     
     # Импортируем и инициализируем БД
     try:
-        from database.database import db
+        from database.database import get_db
+        db = get_db()
         import asyncio
         
         async def init_db():
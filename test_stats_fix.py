@@ -25,7 +25,8 @@ async def test_stats_formatting():
     try:
         # Импортируем необходимые модули
         from handlers.admin import AdminHandlers
-        from database.database import db
+        from database.database import get_db
+        db = get_db()
         from utils.config import Config
         
         print('1️⃣ Проверка импорта модулей...')
@@ -150,7 +151,12 @@ async def main():
     print('📅 Дата:', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     print('')
     
-    success = await test_stats_formatting()
+    try:
+        success = await test_stats_formatting()
+    finally:
+        from database.database import get_db
+        db = get_db()
+        await db.close()
     
     if success:
         print('')
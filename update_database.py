@@ -6,6 +6,10 @@
 
 import asyncio
 import aiosqlite
+from database.models import (
+    LEGACY_PROMO_KEYS, PROMO_DEFAULTS_KEY, SQL_UPSERT_SETTING,
+    configure_connection, decode_promo_defaults, encode_promo_defaults
+)
 from utils.config import Config
 
 async def update_database():
@@ -18,6 +22,7 @@ async def update_database():
     
     try:
         async with aiosqlite.connect(db_path) as db:
+            await configure_connection(db)
             # Проверяем наличие поля feedback_requested в таблице promocodes
             cursor = await db.execute("PRAGMA table_info(promocodes)")
             columns = await cursor.fetchall()
@@ -70,34 +75,69 @@ async def update_database():
             else:
                 print("✓ Таблица feedback уже существует")
             
+            # Таблица настроек хранится по первичному ключу без rowid (без отдельного индекса по key)
+            cursor = await db.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'bot_settings'")
+            settings_table = await cursor.fetchone()
+            if settings_table and 'WITHOUT ROWID' not in settings_table[0].upper():
+                print("➕ Перестройка таблицы bot_settings (WITHOUT ROWID)...")
+                await db.execute("""
+                    CREATE TABLE bot_settings_new (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        updated_date DATETIME DEFAULT CURRENT_TIMESTAMP
+                    ) WITHOUT ROWID
+                """)
+                await db.execute("""
+                    INSERT INTO bot_settings_new (key, value, updated_date)
+                    SELECT key, value, updated_date FROM bot_settings
+                """)
+                await db.execute("DROP TABLE bot_settings")
+                await db.execute("ALTER TABLE bot_settings_new RENAME TO bot_settings")
+                updates_applied.append("bot_settings WITHOUT ROWID")
+            else:
+                print("✓ Таблица bot_settings уже без rowid")
+            
             # Обновляем настройки промокодов (13%, 7 дней)
             print("\n⚙️  Обновление настроек промокодов...")
             
-            # Проверяем текущие значения
-            cursor = await db.execute("SELECT value FROM bot_settings WHERE key = 'promo_discount_percent'")
-            current_discount = await cursor.fetchone()
-            
-            cursor = await db.execute("SELECT value FROM bot_settings WHERE key = 'promo_duration_days'")
-            current_duration = await cursor.fetchone()
+            # Проверяем текущие значения (JSON запись или ключи прежнего формата)
+            keys = (PROMO_DEFAULTS_KEY, *LEGACY_PROMO_KEYS)
+            cursor = await db.execute(
+                f"SELECT key, value FROM bot_settings WHERE key IN ({', '.join('?' * len(keys))})", keys
+            )
+            current = dict(await cursor.fetchall())
+            current_defaults = decode_promo_defaults(current.get(PROMO_DEFAULTS_KEY))
+            for legacy_key, field in LEGACY_PROMO_KEYS.items():
+                if legacy_key in current:
+                    current_defaults.setdefault(field, current[legacy_key])
             
-            if current_discount:
-                print(f"   Текущая скидка: {current_discount[0]}%")
-            if current_duration:
-                print(f"   Текущий срок: {current_duration[0]} дней")
+            if 'discount' in current_defaults:
+                print(f"   Текущая скидка: {current_defaults['discount']}%")
+            if 'duration_days' in current_defaults:
+                print(f"   Текущий срок: {current_defaults['duration_days']} дней")
             
-            # Устанавливаем новые значения
-            await db.execute("""
-                INSERT OR REPLACE INTO bot_settings (key, value, updated_date)
-                VALUES ('promo_discount_percent', '13', datetime('now'))
-            """)
-            await db.execute("""
-                INSERT OR REPLACE INTO bot_settings (key, value, updated_date)
-                VALUES ('promo_duration_days', '7', datetime('now'))
-            """)
+            # Устанавливаем новые значения одной записью
+            await db.execute(SQL_UPSERT_SETTING, (
+                PROMO_DEFAULTS_KEY,
+                encode_promo_defaults({"discount": 13, "duration_days": 7})
+            ))
+            await db.execute(
+                f"DELETE FROM bot_settings WHERE key IN ({', '.join('?' * len(LEGACY_PROMO_KEYS))})",
+                tuple(LEGACY_PROMO_KEYS)
+            )
             updates_applied.append("settings updated to 13% and 7 days")
             
             await db.commit()
             
+            # Включаем инкрементальную автоочистку для существующей БД
+            # (режим меняется только полным VACUUM вне транзакции)
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            if (await cursor.fetchone())[0] != 2:
+                print("\n🧹 Включение auto_vacuum=INCREMENTAL (VACUUM)...")
+                await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                await db.execute("VACUUM")
+                updates_applied.append("auto_vacuum=INCREMENTAL")
+            
             print("\n✅ Обновление завершено успешно!")
             
             if updates_applied:
@@ -5,11 +5,13 @@
 
 import asyncio
 import logging
-from database.database import db
+from database.database import get_db
 from utils.config import Config
 from telegram import Bot
 from telegram.error import TelegramError
 
+db = get_db()
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -30,12 +32,10 @@ async def update_users_from_telegram():
     await db.init()
     
     # Получаем всех пользователей без username
-    async with db.manager.get_connection() as conn:
-        cursor = await conn.execute("""
-            SELECT DISTINCT user_id FROM users 
-            WHERE username IS NULL OR username = ''
-        """)
-        users_without_username = await cursor.fetchall()
+    users_without_username = await db.manager.fetchall("""
+        SELECT DISTINCT user_id FROM users 
+        WHERE username IS NULL OR username = ''
+    """)
     
     logger.info(f"📊 Найдено {len(users_without_username)} пользователей без username в БД")
     
@@ -110,6 +110,14 @@ async def update_users_from_telegram():
     """)
 
 
+async def main():
+    """Запуск обновления с закрытием соединения с БД"""
+    try:
+        await update_users_from_telegram()
+    finally:
+        await db.close()
+
+
 if __name__ == "__main__":
-    asyncio.run(update_users_from_telegram())
+    asyncio.run(main())
 
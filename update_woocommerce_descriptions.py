@@ -5,9 +5,11 @@
 
 import asyncio
 import logging
-from database.database import db
+from database.database import get_db
 from utils.woocommerce import woo_manager
 
+db = get_db()
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -39,10 +41,8 @@ async def update_all_coupon_descriptions():
     logger.info(f"📊 Найдено {len(all_woo_coupons)} купонов в WooCommerce")
     
     # Создаем словарь user_id -> username из БД для быстрого поиска
-    async with db.manager.get_connection() as conn:
-        cursor = await conn.execute("SELECT user_id, username FROM users WHERE username IS NOT NULL")
-        users = await cursor.fetchall()
-        user_mapping = {str(user_id): username for user_id, username in users}
+    users = await db.manager.fetchall("SELECT user_id, username FROM users WHERE username IS NOT NULL")
+    user_mapping = {str(user_id): username for user_id, username in users}
     
     logger.info(f"📋 Загружено {len(user_mapping)} пользователей из БД")
     
@@ -105,6 +105,14 @@ async def update_all_coupon_descriptions():
     """)
 
 
+async def main():
+    """Запуск обновления с закрытием соединения с БД"""
+    try:
+        await update_all_coupon_descriptions()
+    finally:
+        await db.close()
+
+
 if __name__ == "__main__":
-    asyncio.run(update_all_coupon_descriptions())
+    asyncio.run(main())
 
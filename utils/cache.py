@@ -0,0 +1,51 @@
+"""
+Кэширование результатов запросов к внешним API
+"""
+
+import asyncio
+import time
+
+
+class AsyncTTLCache:
+    """Кэш результата корутины на короткое время с объединением одновременных запросов"""
+
+    def __init__(self, ttl: float):
+        """
+        Инициализация кэша
+
+        Args:
+            ttl: Время жизни результата в секундах
+        """
+        self.ttl = ttl
+        self.data = None
+        self._updated_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        """Проверить, что в кэше есть неустаревший результат"""
+        return self.data is not None and time.monotonic() - self._updated_at < self.ttl
+
+    def invalidate(self):
+        """Сбросить кэш (следующий вызов get обратится к источнику)"""
+        self._updated_at = 0.0
+
+    async def get(self, factory):
+        """
+        Вернуть закэшированный результат или получить новый
+
+        Args:
+            factory: Асинхронная функция без аргументов, возвращающая данные
+
+        Returns:
+            Результат factory() не старше ttl секунд
+        """
+        if self.is_fresh():
+            return self.data
+
+        async with self._lock:
+            # Пока ждали блокировку, результат мог обновить другой запрос
+            if self.is_fresh():
+                return self.data
+            self.data = await factory()
+            self._updated_at = time.monotonic()
+            return self.data
@@ -15,8 +15,8 @@ class Config:
     # Основные настройки бота
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     ADMIN_ID = int(os.getenv('ADMIN_ID', 0))
-    # Список ID администраторов
-    ADMIN_IDS = [int(os.getenv('ADMIN_ID', 0)), 6966354959]
+    # Множество ID администраторов (проверка принадлежности за O(1))
+    ADMIN_IDS = frozenset((ADMIN_ID, 6966354959))
     
     # База данных
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///bot_database.db')
@@ -9,11 +9,13 @@ from typing import List, Dict, Optional, Tuple
 from telegram import Bot
 from telegram.constants import ParseMode
 
-from database.database import db
+from database.database import get_db
 from utils.config import Config
 from utils.woocommerce import woo_manager
 from utils.media import media_manager
 
+db = get_db()
+
 logger = logging.getLogger(__name__)
 
 
@@ -134,7 +136,7 @@ class PromoNotificationSystem:
     async def _get_active_promocodes(self) -> List[Dict]:
         """Получить все активные промокоды"""
         try:
-            async with db.manager.get_connection() as conn:
+            async with db.manager.acquire_read() as conn:
                 # ЖЕСТКАЯ ПРОВЕРКА: получаем только промокоды созданные после 17.11.2025
                 # чтобы не трогать старые промокоды, по которым уведомления уже отправлялись
                 cursor = await conn.execute("""
@@ -150,8 +152,7 @@ class PromoNotificationSystem:
                 rows = await cursor.fetchall()
                 
                 # Преобразуем в список словарей
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                return [dict(row) for row in rows]
                 
         except Exception as e:
             logger.error(f"❌ Ошибка получения активных промокодов: {e}")
@@ -213,7 +214,7 @@ class PromoNotificationSystem:
         
         try:
             # Рассчитываем дату истечения промокода
-            created_date = datetime.strptime(promo['created_date'][:19], "%Y-%m-%d %H:%M:%S")
+            created_date = datetime.fromisoformat(promo['created_date'][:19])
             duration_days = await db.settings.get_promo_duration_days()
             expiry_date = created_date + timedelta(days=duration_days)
             
@@ -232,18 +233,16 @@ class PromoNotificationSystem:
                     sent_field = notification_config['field_sent']
                     date_field = notification_config['field_date']
                     
-                    async with db.manager.get_connection() as conn:
-                        check_cursor = await conn.execute(f"""
-                            SELECT {sent_field}, {date_field}
-                            FROM promocodes 
-                            WHERE code = ?
-                        """, (promo['code'],))
-                        check_row = await check_cursor.fetchone()
-                        
-                        # Если уже отправлено (флаг = 1 ИЛИ дата заполнена) - пропускаем
-                        if check_row and (check_row[0] == 1 or check_row[1] is not None):
-                            logger.info(f"⚠️ Уведомление (за {days_before} дн.) для промокода {promo['code']} уже отправлено, пропускаем")
-                            continue
+                    check_row = await db.manager.fetchone(f"""
+                        SELECT {sent_field}, {date_field}
+                        FROM promocodes 
+                        WHERE code = ?
+                    """, (promo['code'],))
+                    
+                    # Если уже отправлено (флаг = 1 ИЛИ дата заполнена) - пропускаем
+                    if check_row and (check_row[0] == 1 or check_row[1] is not None):
+                        logger.info(f"⚠️ Уведомление (за {days_before} дн.) для промокода {promo['code']} уже отправлено, пропускаем")
+                        continue
                     
                     # Проверяем, не отправляли ли уже это уведомление
                     if not promo[sent_field]:
@@ -305,21 +304,19 @@ class PromoNotificationSystem:
     async def _mark_notification_sent(self, promo_code: str, sent_field: str, date_field: str):
         """Пометить уведомление как отправленное"""
         try:
-            async with db.manager.get_connection() as conn:
-                await conn.execute(f"""
-                    UPDATE promocodes 
-                    SET {sent_field} = 1, {date_field} = ?
-                    WHERE code = ?
-                """, (datetime.now().isoformat(), promo_code))
-                await conn.commit()
-                
+            await db.manager.execute(f"""
+                UPDATE promocodes 
+                SET {sent_field} = 1, {date_field} = ?
+                WHERE code = ?
+            """, (datetime.now().isoformat(), promo_code))
+            
         except Exception as e:
             logger.error(f"❌ Ошибка записи отправленного уведомления: {e}")
     
     async def get_notification_stats(self) -> Dict:
         """Получить статистику уведомлений"""
         try:
-            async with db.manager.get_connection() as conn:
+            async with db.manager.acquire_read() as conn:
                 # Статистика отправленных уведомлений
                 cursor = await conn.execute("""
                     SELECT 
@@ -395,69 +392,65 @@ class PromoNotificationSystem:
         logger.info("🔍 Проверка истекших промокодов для запроса обратной связи...")
         
         try:
-            async with db.manager.get_connection() as conn:
-                # ЖЕСТКАЯ ПРОВЕРКА: Получаем промокоды, которые:
-                # 1. Истекли и не были использованы
-                # 2. feedback_requested = 0 (не запрашивалась обратная связь)
-                # 3. feedback_request_date IS NULL (никогда не отправлялась)
-                # 4. Созданы ПОСЛЕ 17.11.2025 (чтобы не трогать старые)
-                cursor = await conn.execute("""
-                    SELECT p.*, u.notifications_enabled, u.is_blocked
-                    FROM promocodes p
-                    JOIN users u ON p.user_id = u.user_id
-                    WHERE p.is_used = 0 
-                    AND p.feedback_requested = 0
-                    AND p.feedback_request_date IS NULL
-                    AND p.created_date > '2025-11-17 00:00:00'
-                    AND u.notifications_enabled = 1 
-                    AND u.is_blocked = 0
-                    ORDER BY p.created_date ASC
-                """)
-                rows = await cursor.fetchall()
-                
-                columns = [description[0] for description in cursor.description]
-                expired_promos = [dict(zip(columns, row)) for row in rows]
-                
-                if not expired_promos:
-                    logger.info("📭 Нет истекших промокодов для запроса обратной связи")
-                    return
-                
-                logger.info(f"📋 Найдено {len(expired_promos)} истекших промокодов для проверки")
-                
-                feedback_requests_sent = 0
-                
-                for promo in expired_promos:
-                    try:
-                        # ДВОЙНАЯ ПРОВЕРКА: проверяем в БД прямо перед отправкой
-                        check_cursor = await conn.execute("""
-                            SELECT feedback_requested, feedback_request_date 
-                            FROM promocodes 
-                            WHERE code = ?
-                        """, (promo['code'],))
-                        check_row = await check_cursor.fetchone()
-                        
-                        if check_row and (check_row[0] == 1 or check_row[1] is not None):
-                            logger.warning(f"⚠️ Промокод {promo['code']} уже получал запрос обратной связи, пропускаем")
-                            continue
-                        
-                        # Проверяем, действительно ли промокод истек
-                        created_date = datetime.strptime(promo['created_date'][:19], "%Y-%m-%d %H:%M:%S")
-                        duration_days = await db.settings.get_promo_duration_days()
-                        expiry_date = created_date + timedelta(days=duration_days)
-                        
-                        # Если промокод истек, отправляем запрос обратной связи
-                        if datetime.now() > expiry_date:
-                            success = await self._send_feedback_request(promo)
-                            if success:
-                                feedback_requests_sent += 1
+            # ЖЕСТКАЯ ПРОВЕРКА: Получаем промокоды, которые:
+            # 1. Истекли и не были использованы
+            # 2. feedback_requested = 0 (не запрашивалась обратная связь)
+            # 3. feedback_request_date IS NULL (никогда не отправлялась)
+            # 4. Созданы ПОСЛЕ 17.11.2025 (чтобы не трогать старые)
+            rows = await db.manager.fetchall("""
+                SELECT p.*, u.notifications_enabled, u.is_blocked
+                FROM promocodes p
+                JOIN users u ON p.user_id = u.user_id
+                WHERE p.is_used = 0 
+                AND p.feedback_requested = 0
+                AND p.feedback_request_date IS NULL
+                AND p.created_date > '2025-11-17 00:00:00'
+                AND u.notifications_enabled = 1 
+                AND u.is_blocked = 0
+                ORDER BY p.created_date ASC
+            """)
+            
+            expired_promos = [dict(row) for row in rows]
+            
+            if not expired_promos:
+                logger.info("📭 Нет истекших промокодов для запроса обратной связи")
+                return
+            
+            logger.info(f"📋 Найдено {len(expired_promos)} истекших промокодов для проверки")
+            
+            feedback_requests_sent = 0
+            
+            for promo in expired_promos:
+                try:
+                    # ДВОЙНАЯ ПРОВЕРКА: проверяем в БД прямо перед отправкой
+                    check_row = await db.manager.fetchone("""
+                        SELECT feedback_requested, feedback_request_date 
+                        FROM promocodes 
+                        WHERE code = ?
+                    """, (promo['code'],))
                     
-                    except Exception as e:
-                        logger.error(f"❌ Ошибка обработки истекшего промокода {promo.get('code', 'UNKNOWN')}: {e}")
+                    if check_row and (check_row[0] == 1 or check_row[1] is not None):
+                        logger.warning(f"⚠️ Промокод {promo['code']} уже получал запрос обратной связи, пропускаем")
                         continue
-                
-                if feedback_requests_sent > 0:
-                    logger.info(f"📤 Отправлено запросов обратной связи: {feedback_requests_sent}")
                     
+                    # Проверяем, действительно ли промокод истек
+                    created_date = datetime.fromisoformat(promo['created_date'][:19])
+                    duration_days = await db.settings.get_promo_duration_days()
+                    expiry_date = created_date + timedelta(days=duration_days)
+                    
+                    # Если промокод истек, отправляем запрос обратной связи
+                    if datetime.now() > expiry_date:
+                        success = await self._send_feedback_request(promo)
+                        if success:
+                            feedback_requests_sent += 1
+                
+                except Exception as e:
+                    logger.error(f"❌ Ошибка обработки истекшего промокода {promo.get('code', 'UNKNOWN')}: {e}")
+                    continue
+            
+            if feedback_requests_sent > 0:
+                logger.info(f"📤 Отправлено запросов обратной связи: {feedback_requests_sent}")
+                
         except Exception as e:
             logger.error(f"❌ Ошибка проверки истекших промокодов: {e}", exc_info=True)
     
@@ -483,13 +476,7 @@ class PromoNotificationSystem:
             )
             
             # Помечаем, что запрос обратной связи отправлен
-            async with db.manager.get_connection() as conn:
-                await conn.execute("""
-                    UPDATE promocodes 
-                    SET feedback_requested = 1, feedback_request_date = ?
-                    WHERE code = ?
-                """, (datetime.now().isoformat(), promo_code))
-                await conn.commit()
+            await db.promo.request_feedback(user_id, promo_code)
             
             logger.info(f"📤 Запрос обратной связи отправлен пользователю {user_id} для промокода {promo_code}")
             return True
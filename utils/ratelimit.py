@@ -0,0 +1,42 @@
+"""
+Ограничение частоты запросов к внешним API
+"""
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """Асинхронный token bucket, общий для всех конкурентных задач"""
+
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        """
+        Инициализация ограничителя
+
+        Args:
+            rate_per_sec: Скорость пополнения (токенов в секунду)
+            burst: Максимальное количество токенов в корзине
+        """
+        if rate_per_sec <= 0:
+            raise ValueError("rate_per_sec должен быть больше нуля")
+
+        self.rate = rate_per_sec
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Пополнить корзину за прошедшее время"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        """Дождаться свободного токена (спит только пока корзина пуста)"""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
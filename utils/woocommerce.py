@@ -12,18 +12,47 @@ import logging
 import pytz
 
 from .config import Config
+from .ratelimit import AsyncTokenBucket
 
 logger = logging.getLogger(__name__)
 
 # Московский часовой пояс
 MOSCOW_TZ = pytz.timezone('Europe/Moscow')
 
+# HTTP/2 включается только если установлен пакет h2 (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def parse_expiry_date(date_expires: Optional[str]) -> Optional[datetime]:
+    """
+    Разобрать date_expires купона WooCommerce
+    
+    Returns:
+        Дата истечения (без часового пояса) или None, если срок не ограничен
+    """
+    if not date_expires:
+        return None  # Промокод без ограничения по времени
+    
+    # ISO формат (2025-10-15T01:56:41) или простой формат даты (2025-10-15)
+    expiry_date = datetime.fromisoformat(date_expires.replace('Z', '+00:00'))
+    # Убираем timezone info для сравнения с локальным временем
+    if expiry_date.tzinfo:
+        expiry_date = expiry_date.replace(tzinfo=None)
+    return expiry_date
+
 
 class WooCommerceManager:
     """Менеджер для работы с WooCommerce API"""
     
     def __init__(self):
         """Инициализация WooCommerce API клиента"""
+        # Общий HTTP клиент с keep-alive, открывается через async with woo_manager
+        self._client: Optional[httpx.AsyncClient] = None
+        
         if not Config.WOOCOMMERCE_ENABLED:
             self.api = None
             return
@@ -45,6 +74,52 @@ class WooCommerceManager:
         """Проверить, включена ли интеграция с WooCommerce"""
         return Config.WOOCOMMERCE_ENABLED and self.api is not None
     
+    async def __aenter__(self):
+        """Открыть общий HTTP клиент на время работы (одно TLS соединение на много запросов)"""
+        # Basic Auth поддерживается только по HTTPS, для HTTP остается OAuth клиент библиотеки
+        if self.is_enabled() and self._client is None and self.api.is_ssl:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.api.url.rstrip('/')}/wp-json/{self.api.version}/",
+                auth=(self.api.consumer_key, self.api.consumer_secret),
+                headers={"user-agent": self.api.user_agent, "accept": "application/json"},
+                timeout=self.api.timeout,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+                http2=HTTP2_AVAILABLE
+            )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        """Закрыть общий HTTP клиент"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request(self, method: str, endpoint: str, params: Dict[str, Any] = None,
+                       data: Dict[str, Any] = None):
+        """
+        Выполнить запрос к WooCommerce API
+        
+        Через общий HTTP клиент, если он открыт, иначе через клиент библиотеки в пуле потоков.
+        
+        Args:
+            method: HTTP метод
+            endpoint: Путь относительно API (например, "coupons")
+            params: Параметры строки запроса
+            data: Тело запроса (JSON)
+            
+        Returns:
+            Ответ с полями status_code и методом json()
+        """
+        if self._client is not None:
+            return await self._client.request(method, endpoint, params=params, json=data)
+        
+        call = getattr(self.api, method.lower())
+        args = (endpoint,) if data is None else (endpoint, data)
+        return await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: call(*args, params=params)
+        )
+    
     async def create_coupon(self, coupon_code: str, user_id: int, 
                            discount_percent: int = None, 
                            usage_limit: int = 1,
@@ -211,10 +286,7 @@ class WooCommerceManager:
         
         try:
             # Ищем купон по коду - правильная передача параметров
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.api.get("coupons", params={"code": coupon_code})
-            )
+            response = await self._request("GET", "coupons", params={"code": coupon_code})
             
             if response.status_code == 200:
                 coupons = response.json()
@@ -237,12 +309,13 @@ class WooCommerceManager:
             logger.error(f"Ошибка получения купона {coupon_code}: {str(e)}")
             return None
     
-    async def delete_coupon(self, coupon_code: str) -> bool:
+    async def delete_coupon(self, coupon_code: str, rate_limiter: Optional[AsyncTokenBucket] = None) -> bool:
         """
         Удалить купон из WooCommerce
         
         Args:
             coupon_code: Код купона
+            rate_limiter: Общий ограничитель частоты (токен берется перед каждым запросом)
             
         Returns:
             True если удален успешно
@@ -252,16 +325,17 @@ class WooCommerceManager:
         
         try:
             # Сначала находим купон
+            if rate_limiter:
+                await rate_limiter.acquire()
             coupon_info = await self.get_coupon(coupon_code)
             if not coupon_info:
                 logger.warning(f"Купон {coupon_code} не найден для удаления")
                 return False
             
             # Удаляем купон
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.api.delete(f"coupons/{coupon_info['id']}", params={"force": True})
-            )
+            if rate_limiter:
+                await rate_limiter.acquire()
+            response = await self._request("DELETE", f"coupons/{coupon_info['id']}", params={"force": True})
             
             if response.status_code == 200:
                 logger.info(f"✅ Купон {coupon_code} удален из WooCommerce")
@@ -274,6 +348,53 @@ class WooCommerceManager:
             logger.error(f"Исключение при удалении купона {coupon_code}: {str(e)}")
             return False
     
+    async def delete_coupons_batch(self, coupon_ids: List[int], batch_size: int = 100,
+                                   rate_limiter: Optional[AsyncTokenBucket] = None) -> Dict[str, List[int]]:
+        """
+        Удалить купоны из WooCommerce пакетно через coupons/batch
+        
+        Args:
+            coupon_ids: ID купонов в WooCommerce
+            batch_size: Размер пакета (WooCommerce принимает не более 100)
+            rate_limiter: Общий ограничитель частоты (токен берется перед каждым пакетом)
+            
+        Returns:
+            Словарь со списками удаленных (deleted) и неудаленных (failed) ID
+        """
+        result = {"deleted": [], "failed": []}
+        
+        if not self.is_enabled():
+            result["failed"] = list(coupon_ids)
+            return result
+        
+        for start in range(0, len(coupon_ids), batch_size):
+            chunk = list(coupon_ids[start:start + batch_size])
+            
+            try:
+                if rate_limiter:
+                    await rate_limiter.acquire()
+                response = await self._request("POST", "coupons/batch", data={"delete": chunk})
+                
+                if response.status_code != 200:
+                    logger.error(f"Ошибка пакетного удаления купонов: {response.status_code}")
+                    result["failed"].extend(chunk)
+                    continue
+                
+                deleted = {
+                    item.get("id") for item in response.json().get("delete", [])
+                    if "error" not in item
+                }
+                for coupon_id in chunk:
+                    result["deleted" if coupon_id in deleted else "failed"].append(coupon_id)
+                
+                logger.info(f"✅ Пакетно удалено купонов из WooCommerce: {len(deleted)} из {len(chunk)}")
+                
+            except Exception as e:
+                logger.error(f"Исключение при пакетном удалении купонов: {str(e)}")
+                result["failed"].extend(chunk)
+        
+        return result
+    
     async def get_coupon_usage_stats(self, days: int = 30) -> Dict[str, Any]:
         """
         Получить статистику использования купонов
@@ -334,7 +455,8 @@ class WooCommerceManager:
         if days is None:
             # Получаем срок из настроек БД
             try:
-                from database.database import db
+                from database.database import get_db
+                db = get_db()
                 days = await db.settings.get_promo_duration_days()
             except Exception as e:
                 logger.error(f"Ошибка получения срока действия из БД: {e}")
@@ -354,7 +476,7 @@ class WooCommerceManager:
             woocommerce_id: ID промокода в WooCommerce (если известен)
             
         Returns:
-            Информация о статусе промокода
+            Информация о статусе промокода (synced, is_used, usage_count, expiry_date, coupon_info)
         """
         if not self.is_enabled():
             return {
@@ -377,10 +499,18 @@ class WooCommerceManager:
                 
                 logger.info(f"🔄 Промокод {coupon_code}: использований в WooCommerce = {usage_count}")
                 
+                # Дата истечения из того же ответа, без повторного запроса купона
+                try:
+                    expiry_date = parse_expiry_date(coupon_info.get("date_expires"))
+                except ValueError as e:
+                    logger.warning(f"⚠️ Не удалось разобрать дату истечения промокода {coupon_code}: {e}")
+                    expiry_date = None
+                
                 return {
                     "synced": True,
                     "is_used": is_used,
                     "usage_count": usage_count,
+                    "expiry_date": expiry_date,
                     "coupon_info": coupon_info
                 }
             else:
@@ -439,12 +569,13 @@ class WooCommerceManager:
                 "error": str(e)
             }
     
-    async def mark_coupon_as_used(self, coupon_code: str) -> Dict[str, Any]:
+    async def mark_coupon_as_used(self, coupon_code: str, coupon_id: int = None) -> Dict[str, Any]:
         """
         Отметить купон как использованный в WooCommerce
         
         Args:
             coupon_code: Код купона для пометки как использованный
+            coupon_id: ID купона в WooCommerce, если известен (поиск по коду не выполняется)
             
         Returns:
             Результат операции
@@ -456,22 +587,23 @@ class WooCommerceManager:
             }
         
         try:
-            # Сначала найдем купон
-            coupon_info = await self.get_coupon(coupon_code)
-            if not coupon_info:
-                return {
-                    "success": False,
-                    "error": f"Купон {coupon_code} не найден"
-                }
-            
-            coupon_id = coupon_info["id"]
+            if not coupon_id:
+                # ID неизвестен - сначала найдем купон по коду
+                coupon_info = await self.get_coupon(coupon_code)
+                if not coupon_info:
+                    return {
+                        "success": False,
+                        "error": f"Купон {coupon_code} не найден"
+                    }
+                
+                coupon_id = coupon_info["id"]
             
-            # Отмечаем купон как использованный через описание и статус
-            current_usage = coupon_info.get('usage_count', 0)
+            # Отмечаем купон как использованный через описание и статус;
+            # usage_count не передается и остается таким, каким его ведет WooCommerce
             used_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             update_data = {
-                "description": f"🔴 ИСПОЛЬЗОВАН АДМИНИСТРАТОРОМ ({current_usage + 1}/1) | Отмечен: {used_date}",
+                "description": f"🔴 ИСПОЛЬЗОВАН АДМИНИСТРАТОРОМ | Отмечен: {used_date}",
                 "status": "private",  # Делаем купон приватным (неактивным для пользователей)
                 "usage_limit": 1,    # Устанавливаем лимит 1  
                 "usage_limit_per_user": 1,  # Лимит на пользователя 1
@@ -528,22 +660,7 @@ class WooCommerceManager:
             if not coupon_info:
                 return None
             
-            date_expires = coupon_info.get('date_expires')
-            if not date_expires:
-                return None  # Промокод без ограничения по времени
-            
-            # Парсим дату истечения
-            if 'T' in date_expires:
-                # ISO формат: 2025-10-15T01:56:41
-                expiry_date = datetime.fromisoformat(date_expires.replace('Z', '+00:00'))
-                # Убираем timezone info для сравнения с локальным временем
-                if expiry_date.tzinfo:
-                    expiry_date = expiry_date.replace(tzinfo=None)
-            else:
-                # Простой формат даты: 2025-10-15
-                expiry_date = datetime.strptime(date_expires, '%Y-%m-%d')
-            
-            return expiry_date
+            return parse_expiry_date(coupon_info.get('date_expires'))
             
         except Exception as e:
             logger.error(f"Ошибка получения даты истечения промокода {coupon_code}: {str(e)}")